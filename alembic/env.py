@@ -12,6 +12,7 @@ from src.authors.models import *
 from src.genres.models import *
 from src.books.models import *
 from src.library.models import *
+from src.core.models import *
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -39,6 +40,13 @@ target_metadata = Base.metadata
 config.set_main_option("sqlalchemy.url", setting.db.url)
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # Триграммные индексы (pg_trgm) создаются только миграциями
+    if type_ == "index" and reflected and compare_to is None and name.endswith("_trgm"):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -55,6 +63,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -64,7 +73,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,32 @@
+"""creat table table_versions
+
+Revision ID: db96be99d9f1
+Revises: 2aca0fc4dabe
+Create Date: 2026-10-18 17:31:31.655328
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "db96be99d9f1"
+down_revision: Union[str, None] = "2aca0fc4dabe"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "table_versions",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("table_versions")
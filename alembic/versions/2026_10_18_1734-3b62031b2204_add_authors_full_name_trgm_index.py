@@ -0,0 +1,35 @@
+"""add authors full_name trgm index
+
+Revision ID: 3b62031b2204
+Revises: 43b920877233
+Create Date: 2026-10-18 17:34:18.606796
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3b62031b2204"
+down_revision: Union[str, None] = "43b920877233"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_authors_full_name_trgm",
+        "authors",
+        ["full_name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"full_name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_authors_full_name_trgm", table_name="authors")
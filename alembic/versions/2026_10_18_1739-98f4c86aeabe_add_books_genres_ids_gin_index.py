@@ -0,0 +1,33 @@
+"""add books genres_ids gin index
+
+Revision ID: 98f4c86aeabe
+Revises: 3b62031b2204
+Create Date: 2026-10-18 17:39:02.803848
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "98f4c86aeabe"
+down_revision: Union[str, None] = "3b62031b2204"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_books_genres_ids",
+        "books",
+        ["genres_ids"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_genres_ids", table_name="books")
@@ -0,0 +1,210 @@
+"""create books read model
+
+Revision ID: 4d12e57c38f6
+Revises: 98f4c86aeabe
+Create Date: 2026-10-18 17:53:04.289081
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4d12e57c38f6"
+down_revision: Union[str, None] = "98f4c86aeabe"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BOOKS_READ_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION books_read_genres(ids integer[]) RETURNS varchar[] AS $$
+        SELECT coalesce(array_agg(coalesce(g.title, 'отсутствует') ORDER BY u.n), '{}')
+        FROM unnest(ids) WITH ORDINALITY AS u(id, n)
+        LEFT JOIN genre AS g ON g.id = u.id
+    $$ LANGUAGE sql STABLE
+    """,
+    """
+    CREATE OR REPLACE FUNCTION books_read_sync_book() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO books_read (
+            id, title, description, release_date, count,
+            author_id, author_full_name, genres_ids, genres
+        )
+        SELECT NEW.id, NEW.title, NEW.description, NEW.release_date, NEW.count,
+            NEW.id_author, a.full_name, NEW.genres_ids,
+            books_read_genres(NEW.genres_ids)
+        FROM authors AS a
+        WHERE a.id = NEW.id_author
+        ON CONFLICT (id) DO UPDATE SET
+            title = EXCLUDED.title,
+            description = EXCLUDED.description,
+            release_date = EXCLUDED.release_date,
+            count = EXCLUDED.count,
+            author_id = EXCLUDED.author_id,
+            author_full_name = EXCLUDED.author_full_name,
+            genres_ids = EXCLUDED.genres_ids,
+            genres = EXCLUDED.genres;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION books_read_sync_author() RETURNS trigger AS $$
+    BEGIN
+        UPDATE books_read SET author_full_name = NEW.full_name
+        WHERE author_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION books_read_sync_genre() RETURNS trigger AS $$
+    DECLARE
+        genre_id integer;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            genre_id := OLD.id;
+        ELSE
+            genre_id := NEW.id;
+        END IF;
+        UPDATE books_read SET genres = books_read_genres(genres_ids)
+        WHERE genres_ids @> ARRAY[genre_id];
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER books_read_sync AFTER INSERT OR UPDATE ON books
+    FOR EACH ROW EXECUTE FUNCTION books_read_sync_book()
+    """,
+    """
+    CREATE TRIGGER books_read_sync AFTER UPDATE OF full_name ON authors
+    FOR EACH ROW WHEN (OLD.full_name IS DISTINCT FROM NEW.full_name)
+    EXECUTE FUNCTION books_read_sync_author()
+    """,
+    """
+    CREATE TRIGGER books_read_sync AFTER INSERT OR UPDATE OR DELETE ON genre
+    FOR EACH ROW EXECUTE FUNCTION books_read_sync_genre()
+    """,
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "books_read",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(length=100), nullable=False),
+        sa.Column("description", sa.String(length=250), nullable=False),
+        sa.Column("release_date", sa.DateTime(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.Column("author_full_name", sa.String(), nullable=False),
+        sa.Column("genres_ids", postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column("genres", postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('russian', title) || to_tsvector('simple', title)",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["id"], ["books.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_books_read_author_id"), "books_read", ["author_id"], unique=False
+    )
+    op.create_index(
+        "ix_books_read_genres_ids",
+        "books_read",
+        ["genres_ids"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_books_read_search_vector",
+        "books_read",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_books_read_title_trgm",
+        "books_read",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    for statement in BOOKS_READ_DDL:
+        op.execute(statement)
+    op.execute(
+        """
+        INSERT INTO books_read (
+            id, title, description, release_date, count,
+            author_id, author_full_name, genres_ids, genres
+        )
+        SELECT b.id, b.title, b.description, b.release_date, b.count,
+            b.id_author, a.full_name, b.genres_ids, books_read_genres(b.genres_ids)
+        FROM books AS b
+        JOIN authors AS a ON a.id = b.id_author
+        """
+    )
+    # Поиск и фильтр по жанрам теперь обслуживает books_read
+    op.drop_index("ix_books_title_trgm", table_name="books")
+    op.drop_index("ix_books_genres_ids", table_name="books")
+    op.drop_index("ix_books_search_vector", table_name="books")
+    op.drop_column("books", "search_vector")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "books",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('russian', title) || to_tsvector('simple', title)",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_books_search_vector",
+        "books",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_books_genres_ids",
+        "books",
+        ["genres_ids"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_books_title_trgm",
+        "books",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.execute("DROP FUNCTION IF EXISTS books_read_sync_book() CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS books_read_sync_author() CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS books_read_sync_genre() CASCADE")
+    op.drop_index("ix_books_read_title_trgm", table_name="books_read")
+    op.drop_index("ix_books_read_search_vector", table_name="books_read")
+    op.drop_index("ix_books_read_genres_ids", table_name="books_read")
+    op.drop_index(op.f("ix_books_read_author_id"), table_name="books_read")
+    op.drop_table("books_read")
+    op.execute("DROP FUNCTION IF EXISTS books_read_genres(integer[])")
@@ -0,0 +1,145 @@
+"""create table circulation_stats
+
+Revision ID: 4fbd61d31e1a
+Revises: 2892336b9b77
+Create Date: 2026-10-18 18:07:01.852631
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4fbd61d31e1a"
+down_revision: Union[str, None] = "2892336b9b77"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CIRCULATION_STATS_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION circulation_stats_add(
+        book integer, reader integer, delta integer, loans integer
+    ) RETURNS void AS $$
+        INSERT INTO circulation_stats AS s (kind, object_id, active, total)
+        SELECT k.kind, k.object_id, delta, loans
+        FROM (
+            VALUES ('all', mod(reader, 16)), ('book', book), ('user', reader)
+            UNION ALL
+            -- Повтор жанра в genres_ids дал бы две строки одного ключа в ON CONFLICT
+            SELECT DISTINCT 'genre', unnest(b.genres_ids)
+            FROM books AS b WHERE b.id = book
+        ) AS k(kind, object_id)
+        ORDER BY k.kind, k.object_id
+        ON CONFLICT (kind, object_id) DO UPDATE SET
+            active = s.active + EXCLUDED.active,
+            total = s.total + EXCLUDED.total
+    $$ LANGUAGE sql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION circulation_stats_loan() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM circulation_stats_add(NEW.book_id, NEW.user_id, 1, 1);
+        ELSE
+            PERFORM circulation_stats_add(OLD.book_id, OLD.user_id, -1, 0);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION circulation_stats_genres() RETURNS trigger AS $$
+    BEGIN
+        -- Выданные экземпляры переходят из старых жанров книги в новые
+        UPDATE circulation_stats AS s SET active = s.active - b.active
+        FROM circulation_stats AS b
+        WHERE b.kind = 'book' AND b.object_id = NEW.id
+            AND s.kind = 'genre' AND s.object_id = ANY(OLD.genres_ids);
+        INSERT INTO circulation_stats AS s (kind, object_id, active, total)
+        SELECT 'genre', g.id, b.active, 0
+        FROM circulation_stats AS b,
+            unnest(ARRAY(SELECT DISTINCT unnest(NEW.genres_ids))) AS g(id)
+        WHERE b.kind = 'book' AND b.object_id = NEW.id
+        ON CONFLICT (kind, object_id) DO UPDATE SET
+            active = s.active + EXCLUDED.active;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION circulation_stats_forget() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM circulation_stats
+        WHERE kind = TG_ARGV[0] AND object_id = OLD.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER circulation_stats_sync AFTER INSERT OR DELETE ON receiving_books
+    FOR EACH ROW EXECUTE FUNCTION circulation_stats_loan()
+    """,
+    """
+    CREATE TRIGGER circulation_stats_sync AFTER UPDATE OF genres_ids ON books
+    FOR EACH ROW WHEN (OLD.genres_ids IS DISTINCT FROM NEW.genres_ids)
+    EXECUTE FUNCTION circulation_stats_genres()
+    """,
+    """
+    CREATE TRIGGER circulation_stats_forget AFTER DELETE ON books
+    FOR EACH ROW EXECUTE FUNCTION circulation_stats_forget('book')
+    """,
+    """
+    CREATE TRIGGER circulation_stats_forget AFTER DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION circulation_stats_forget('user')
+    """,
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "circulation_stats",
+        sa.Column("kind", sa.String(length=10), nullable=False),
+        sa.Column("object_id", sa.Integer(), nullable=False),
+        sa.Column("active", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("total", sa.Integer(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("kind", "object_id"),
+    )
+    op.create_index(
+        "ix_circulation_stats_kind_active",
+        "circulation_stats",
+        ["kind", "active", "total"],
+        unique=False,
+    )
+    for statement in CIRCULATION_STATS_DDL:
+        op.execute(statement)
+    # История выдач не хранится: total начинается с выданных сейчас книг
+    op.execute(
+        """
+        INSERT INTO circulation_stats (kind, object_id, active, total)
+        SELECT k.kind, k.object_id, count(*), count(*)
+        FROM receiving_books AS r
+        JOIN books AS b ON b.id = r.book_id
+        CROSS JOIN LATERAL (
+            VALUES ('all', mod(r.user_id, 16)), ('book', r.book_id), ('user', r.user_id)
+            UNION ALL
+            SELECT DISTINCT 'genre', unnest(b.genres_ids)
+        ) AS k(kind, object_id)
+        GROUP BY k.kind, k.object_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS circulation_stats_loan() CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS circulation_stats_genres() CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS circulation_stats_forget() CASCADE")
+    op.drop_index("ix_circulation_stats_kind_active", table_name="circulation_stats")
+    op.drop_table("circulation_stats")
+    op.execute(
+        "DROP FUNCTION IF EXISTS "
+        "circulation_stats_add(integer, integer, integer, integer)"
+    )
@@ -0,0 +1,45 @@
+"""
+Стоимость проверки cookie на запрос: jwt.decode каждый раз
+и decode_jwt с кешем проверенных токенов.
+
+    python -m benchmarks.decode_jwt_cache --requests 100000
+"""
+
+import argparse
+import time
+
+import jwt
+
+from src.core.config import setting, setting_conn
+from src.core.jwt_utils import create_jwt, decode_jwt, verified_tokens
+
+
+def run(name: str, requests: int, decode) -> None:
+    started: float = time.perf_counter()
+    for _ in range(requests):
+        decode()
+    duration: float = time.perf_counter() - started
+    print(
+        "%-8s %d decodes, %.2f us per request"
+        % (name, requests, duration / requests * 1e6)
+    )
+
+
+def main(requests: int) -> None:
+    token: str = create_jwt("1", is_superuser=False, version=0)
+    algorithms: list[str] = [setting.auth_jwt.algorithm]
+
+    run(
+        "pyjwt",
+        requests,
+        lambda: jwt.decode(token, setting_conn.SECRET_KEY, algorithms),
+    )
+    run("cached", requests, lambda: decode_jwt(token))
+    print("hits %d, misses %d" % (verified_tokens.hits, verified_tokens.misses))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="decode_jwt with verified token cache")
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+    main(requests=args.requests)
@@ -0,0 +1,108 @@
+"""
+Вход обычных пользователей во время перебора паролей: без ограничения
+и с LoginThrottle. Каждая пропущенная попытка стоит одной проверки bcrypt
+в PasswordHasher, как в /users/login.
+
+    python -m benchmarks.login_throttle_load --attempts 200 --attack-ips 2 --users 10
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Optional
+
+from src.core.config import setting
+from src.core.hashing import PasswordHasher
+from src.core.jwt_utils import create_hash_password
+from src.users.throttling import LoginThrottle, TokenBucketLimiter
+
+PASSWORD = "1qaz!QAZ"
+
+
+def make_throttle() -> LoginThrottle:
+    config = setting.login_throttle
+    return LoginThrottle(
+        by_username=TokenBucketLimiter(
+            config.username_rate, config.username_burst, config.max_entries, 60
+        ),
+        by_ip=TokenBucketLimiter(
+            config.ip_rate, config.ip_burst, config.max_entries, 60
+        ),
+    )
+
+
+async def login(
+    hasher: PasswordHasher,
+    throttle: Optional[LoginThrottle],
+    username: str,
+    ip: str,
+    password: str,
+    hashed_password: bytes,
+) -> tuple[bool, float]:
+    started: float = time.monotonic()
+    if throttle is not None and throttle.acquire(username=username, ip=ip):
+        return False, time.monotonic() - started
+    valid: bool = await hasher.verify(password, hashed_password)
+    return valid, time.monotonic() - started
+
+
+async def run(name: str, throttle: Optional[LoginThrottle], args) -> None:
+    hashed_password: bytes = create_hash_password(PASSWORD)
+    hasher = PasswordHasher(
+        executor="thread", workers=args.workers, max_queue=args.attempts + args.users
+    )
+    attack = [
+        login(
+            hasher,
+            throttle,
+            f"victim{attempt % 3}",
+            f"10.0.0.{attempt % args.attack_ips}",
+            "wrong",
+            hashed_password,
+        )
+        for attempt in range(args.attempts)
+    ]
+    legit = [
+        login(
+            hasher,
+            throttle,
+            f"user{user}",
+            f"192.168.0.{user}",
+            PASSWORD,
+            hashed_password,
+        )
+        for user in range(args.users)
+    ]
+    started: float = time.monotonic()
+    results = await asyncio.gather(*attack, *legit)
+    duration: float = time.monotonic() - started
+    legit_results = results[args.attempts :]
+    latencies: list[float] = sorted(latency for _, latency in legit_results)
+    print(
+        "%-10s %.2f s, bcrypt calls %d, legit logins ok %d/%d, "
+        "legit p50 %.2f s, max %.2f s"
+        % (
+            name,
+            duration,
+            hasher.metrics.calls_total,
+            sum(valid for valid, _ in legit_results),
+            args.users,
+            latencies[len(latencies) // 2],
+            latencies[-1],
+        )
+    )
+    hasher.shutdown()
+
+
+async def main(args) -> None:
+    await run("open", None, args)
+    await run("throttled", make_throttle(), args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Legit logins under a login attack")
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--attack-ips", type=int, default=2)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
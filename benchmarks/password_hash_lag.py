@@ -0,0 +1,70 @@
+"""
+Задержка цикла событий при входе пользователей: bcrypt прямо в корутине
+и bcrypt в пуле PasswordHasher.
+
+    python -m benchmarks.password_hash_lag --logins 32 --workers 4
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.core.hashing import PasswordHasher
+from src.core.jwt_utils import create_hash_password, validate_password
+
+PASSWORD = "1qaz!QAZ"
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.005) -> list[float]:
+    # Насколько позже запланированного просыпается корутина
+    lags: list[float] = list()
+    while not stop.is_set():
+        started: float = time.monotonic()
+        await asyncio.sleep(interval)
+        lags.append(time.monotonic() - started - interval)
+    return lags
+
+
+async def login_inline(hashed_password: bytes) -> bool:
+    return validate_password(PASSWORD, hashed_password)
+
+
+async def run(name: str, logins: int, login) -> None:
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(stop))
+    await asyncio.sleep(0.05)
+    started: float = time.monotonic()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    duration: float = time.monotonic() - started
+    stop.set()
+    lags: list[float] = sorted(await ticker)
+    print(
+        "%-8s logins %d in %.2f s, loop lag p50 %.1f ms, p99 %.1f ms, max %.1f ms"
+        % (
+            name,
+            logins,
+            duration,
+            lags[len(lags) // 2] * 1000,
+            lags[int(len(lags) * 0.99)] * 1000,
+            lags[-1] * 1000,
+        )
+    )
+
+
+async def main(logins: int, workers: int, executor: str) -> None:
+    hashed_password: bytes = create_hash_password(PASSWORD)
+    hasher = PasswordHasher(executor=executor, workers=workers, max_queue=logins)
+
+    await run("inline", logins, lambda: login_inline(hashed_password))
+    await run("pool", logins, lambda: hasher.verify(PASSWORD, hashed_password))
+    print(hasher.metrics.model_dump_json(indent=2))
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event loop lag during bcrypt")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    args = parser.parse_args()
+    asyncio.run(main(logins=args.logins, workers=args.workers, executor=args.executor))
@@ -7,6 +7,8 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.authors.models import Author
+from src.books.models import Book
+from src.books.suggest import SUGGEST_VERSION, suggest_index
 from src.authors.schemas import (
     AuthorCreateSchemas,
     OutAuthorSchemas,
@@ -14,7 +16,9 @@ from src.authors.schemas import (
     AuthorUpdatePartialSchemas,
 )
 from src.core.exceptions import ErrorInData, ExceptDB
+from src.core.cache import cache_tag, response_cache
 from src.core.config import configure_logging
+from src.core.versions import bump_version
 
 configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,7 +38,11 @@ async def create_author(
         raise ExceptDB(exc)
     else:
         session.add(author)
+        await bump_version(session=session, name=Author.__tablename__)
+        version: int = await bump_version(session=session, name=SUGGEST_VERSION)
         await session.commit()
+        await response_cache.invalidate(cache_tag("author"))
+        suggest_index.put("author", author.id, author.full_name, version)
         return author
 
 
@@ -62,25 +70,47 @@ async def update_author_db(
     partial: bool = False,
 ) -> Author:
     logger.info("Start update author")
+    full_name: str = author.full_name
+    version: Optional[int] = None
     try:
         for name, value in author_update.model_dump(
             exclude_unset=partial
         ).items():  # Преобразовываем объект в словарь
             setattr(author, name, value)
+        await bump_version(session=session, name=Author.__tablename__)
+        if author.full_name != full_name:
+            version = await bump_version(session=session, name=SUGGEST_VERSION)
         await session.commit()
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
         await session.rollback()
         raise ExceptDB(exc)
+    await response_cache.invalidate(cache_tag("author"), cache_tag("author", author.id))
+    if version is not None:
+        suggest_index.put("author", author.id, author.full_name, version)
     return author
 
 
 async def delete_author_db(session: AsyncSession, author: Author) -> None:
     logger.info("Delete author by id %d" % author.id)
     try:
+        result: Result = await session.execute(
+            select(Book.id).filter(Book.id_author == author.id)
+        )
+        books_ids: list[int] = list(result.scalars().all())
         await session.delete(author)
+        # Книги автора удаляются каскадно
+        await bump_version(session=session, name=Author.__tablename__)
+        await bump_version(session=session, name=Book.__tablename__)
+        version: int = await bump_version(session=session, name=SUGGEST_VERSION)
         await session.commit()
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
         await session.rollback()
         raise ExceptDB(exc)
+    await response_cache.invalidate(
+        cache_tag("author"), cache_tag("author", author.id), cache_tag("book")
+    )
+    suggest_index.discard("author", author.id, version)
+    for book_id in books_ids:
+        suggest_index.discard("book", book_id, version)
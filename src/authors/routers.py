@@ -1,10 +1,12 @@
 from typing import TYPE_CHECKING
 
-from fastapi import APIRouter, Depends, Response, status
+from fastapi import APIRouter, Depends, Request, Response, status
 from fastapi.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.cache import cache_tag, request_key, response_cache
 from src.core.database import get_async_session
+from src.core.etag import etag_for
 from src.core.exceptions import (
     ErrorInData,
     ExceptDB,
@@ -61,15 +63,26 @@ async def new_author(
     "/list", response_model=list[OutAuthorSchemas], status_code=status.HTTP_200_OK
 )
 async def get_list_author(
+    request: Request,
     session: AsyncSession = Depends(get_async_session),
     user: "User" = Depends(current_superuser_user),
+    etag: None = Depends(etag_for(Author.__tablename__)),
 ):
-    return await get_authors(session=session)
+    async def get_list() -> list[OutAuthorSchemas]:
+        authors: list[Author] = await get_authors(session=session)
+        return [OutAuthorSchemas.model_validate(author) for author in authors]
+
+    return await response_cache.get_or_set(
+        key=request_key(request),
+        factory=get_list,
+        tags=lambda result: [cache_tag("author")],
+    )
 
 
 @router.get("/{author_id}/", response_model=OutAuthorSchemas)
 async def get_author(
     user: "User" = Depends(current_superuser_user),
+    etag: None = Depends(etag_for(Author.__tablename__)),
     author: Author = Depends(author_by_id),
 ):
     return author
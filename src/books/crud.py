@@ -1,14 +1,33 @@
 import logging
-from typing import Optional, Union
+import re
+from typing import Literal, Optional, Sequence, Union
 
-from sqlalchemy import select
-from sqlalchemy.orm import joinedload, selectinload
+from fastapi_pagination import Page, set_page
+from fastapi_pagination.ext.sqlalchemy import paginate
+
+from sqlalchemy import (
+    ARRAY,
+    ColumnElement,
+    Integer,
+    Select,
+    cast,
+    distinct,
+    exists,
+    extract,
+    func,
+    literal,
+    not_,
+    or_,
+    select,
+    true,
+    tuple_,
+)
 from sqlalchemy.engine import Result
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.authors.crud import get_author
-from src.books.models import Book
+from src.books.models import Book, BookRead
+from src.books.suggest import SUGGEST_VERSION, suggest_index
 from src.books.schemas import (
     BookUpdateSchemas,
     BookUpdatePartialSchemas,
@@ -18,30 +37,98 @@ from src.books.schemas import (
     BookFindSchemas,
     OutBookShortSchemas,
     OutAuthorBooksSchemas,
+    OutBooksCursorSchemas,
+    AuthorFacetSchemas,
+    DecadeFacetSchemas,
+    FacetPage,
+    GenreFacetSchemas,
+    OutFacetsSchemas,
 )
 from src.core.exceptions import ErrorInData, ExceptDB
+from src.core.cache import cache_tag, response_cache
 from src.core.config import configure_logging
+from src.core.versions import bump_version
 from src.authors.models import Author
 from src.genres.models import Genre
 
 configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
+GenreMatch = Literal["any", "all"]
+
+# Остатки книг меняет каждая выдача и возврат. Их версия разбита на
+# BOOK_COUNT_SHARDS строк table_versions по id книги, чтобы выдачи
+# разных книг не ждали блокировку одной строки "books"
+BOOK_COUNT_SHARDS = 16
+BOOK_COUNT_VERSIONS = tuple(
+    f"{Book.__tablename__}_count:{shard}" for shard in range(BOOK_COUNT_SHARDS)
+)
+
+
+async def bump_count_versions(session: AsyncSession, books_ids: Sequence[int]) -> None:
+    # Строки версий блокируются в одном порядке: пакетные выдачи без взаимоблокировок
+    for shard in sorted({book_id % BOOK_COUNT_SHARDS for book_id in books_ids}):
+        await bump_version(session=session, name=BOOK_COUNT_VERSIONS[shard])
+
+
+def links_error_message(
+    id_author: Optional[int], author_exists: bool, missing_genres: Optional[list[int]]
+) -> Optional[str]:
+    errors: list[str] = list()
+    if not author_exists:
+        errors.append(f"Not find author with id {id_author}")
+    if missing_genres:
+        errors.append(
+            "Not find genres with id %s" % ", ".join(map(str, sorted(missing_genres)))
+        )
+    return "; ".join(errors) if errors else None
+
+
+async def check_book_links(
+    session: AsyncSession,
+    id_author: Optional[int] = None,
+    genres_ids: Optional[list[int]] = None,
+) -> None:
+    """
+    Проверка автора и всех жанров книги одним запросом
+    :param session: AsyncSession
+        сессия базы данных
+    :param id_author: Optional[int]
+        id автора, None - автор не проверяется
+    :param genres_ids: Optional[list[int]]
+        id жанров, None - жанры не проверяются
+    :return: None
+        при отсутствии автора или жанров вызывается ErrorInData
+        со всеми ненайденными id
+    """
+    author_exists = (
+        exists().where(Author.id == id_author) if id_author is not None else true()
+    )
+    genre_id = func.unnest(literal(genres_ids or [], ARRAY(Integer))).column_valued(
+        "genre_id"
+    )
+    missing_genres = (
+        select(func.array_agg(genre_id))
+        .where(not_(exists().where(Genre.id == genre_id)))
+        .scalar_subquery()
+    )
+    result: Result = await session.execute(select(author_exists, missing_genres))
+    row = result.one()
+    message: Optional[str] = links_error_message(
+        id_author=id_author, author_exists=row[0], missing_genres=row[1]
+    )
+    if message:
+        logger.info(message)
+        raise ErrorInData(message)
+
 
 async def create_book(session: AsyncSession, book_in: BookCreateSchemas) -> Book:
     logger.info("Start create new book")
-    author: Author = await get_author(
-        session=session, author_id=book_in.model_dump()["id_author"]
+    await check_book_links(
+        session=session,
+        id_author=book_in.id_author,
+        genres_ids=book_in.genres_ids,
     )
-    if author is None:
-        logger.info("Not find author")
-        raise ErrorInData("Not find author")
-
-    genres_id: list[int] = book_in.model_dump()["genres_ids"]
-    for genre_id in genres_id:
-        if await session.get(Genre, genre_id) is None:
-            logger.info("Not find genres with id %s" % genre_id)
-            raise ErrorInData(f"Not find genres with id {genre_id}")
 
     try:
         book: Book = Book(**book_in.model_dump())
@@ -53,20 +140,20 @@ async def create_book(session: AsyncSession, book_in: BookCreateSchemas) -> Book
         raise ExceptDB(exc)
     else:
         session.add(book)
+        await bump_version(session=session, name=Book.__tablename__)
+        version: int = await bump_version(session=session, name=SUGGEST_VERSION)
         await session.commit()
+        await response_cache.invalidate(cache_tag("book"))
+        suggest_index.put("book", book.id, book.title, version)
         logger.info("New book create")
         return book
 
 
-async def book_to_schema(session: AsyncSession, book: Book) -> OutBookFoolSchemas:
+def book_to_schema(book: BookRead) -> OutBookFoolSchemas:
     # OutBookFoolSchemas
     author: AuthorSchemas = AuthorSchemas(
-        id=book.author.id, full_name=book.author.full_name
+        id=book.author_id, full_name=book.author_full_name
     )
-    list_genres = list()
-    for i_genres in book.genres_ids:
-        genres = await session.get(Genre, i_genres)
-        list_genres.append(genres.title if genres else "отсутствует")
     res: OutBookFoolSchemas = OutBookFoolSchemas(
         id=book.id,
         title=book.title,
@@ -74,25 +161,67 @@ async def book_to_schema(session: AsyncSession, book: Book) -> OutBookFoolSchema
         author=author,
         release_date=book.release_date,
         count=book.count,
-        genres=list_genres,
+        genres=book.genres,
     )
     return res
 
 
-async def get_books(session: AsyncSession) -> list[OutBookFoolSchemas]:
-    logger.info("Getting a list of books")
+def books_to_schema(books: Sequence[BookRead]) -> list[OutBookFoolSchemas]:
+    # Автор и названия жанров уже подставлены в модели чтения books_read
+    return [book_to_schema(book=book) for book in books]
+
+
+def filter_genres(
+    stmt: Select, genre_ids: Optional[list[int]], genre_match: GenreMatch
+) -> Select:
+    # && (любой из жанров) и @> (все жанры) обслуживает GIN индекс
+    # ix_books_read_genres_ids
+    if not genre_ids:
+        return stmt
+    operator: str = "@>" if genre_match == "all" else "&&"
+    return stmt.filter(BookRead.genres_ids.op(operator)(genre_ids))
+
+
+async def get_books(
+    session: AsyncSession,
+    genre_ids: Optional[list[int]] = None,
+    genre_match: GenreMatch = "any",
+) -> Page[OutBookFoolSchemas]:
+    logger.info("Getting a page of books, genres %s (%s)" % (genre_ids, genre_match))
+
+    stmt = select(BookRead).order_by(BookRead.id)
+    stmt = filter_genres(stmt=stmt, genre_ids=genre_ids, genre_match=genre_match)
     try:
-        stmt = select(Book).options(joinedload(Book.author)).order_by(Book.id)
-        result: Result = await session.execute(stmt)
+        return await paginate(session, stmt, transformer=books_to_schema)
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        raise ExceptDB(exc)
+
+
+async def get_books_cursor(
+    session: AsyncSession,
+    cursor: Optional[int],
+    size: int,
+    genre_ids: Optional[list[int]] = None,
+    genre_match: GenreMatch = "any",
+) -> OutBooksCursorSchemas:
+    logger.info("Getting books after id %s" % cursor)
+    stmt = select(BookRead).order_by(BookRead.id)
+    stmt = filter_genres(stmt=stmt, genre_ids=genre_ids, genre_match=genre_match)
+    if cursor is not None:
+        stmt = stmt.filter(BookRead.id > cursor)
+    try:
+        # Лишняя запись показывает, есть ли следующая страница
+        result: Result = await session.execute(stmt.limit(size + 1))
         books = result.scalars().all()
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
-    else:
-        list_books = list()
-        for book in books:  # type: Book
-            list_books.append(await book_to_schema(session=session, book=book))
+        raise ExceptDB(exc)
+
+    next_cursor: Optional[int] = books[size - 1].id if len(books) > size else None
+    list_books = books_to_schema(books=books[:size])
 
-        return list_books
+    return OutBooksCursorSchemas(items=list_books, next_cursor=next_cursor)
 
 
 async def get_book(session: AsyncSession, book_id: int) -> Optional[Book]:
@@ -107,26 +236,31 @@ async def update_book_db(
     partial: bool = False,
 ) -> Book:
     logger.info("Start update book")
+    values: dict = book_update.model_dump(exclude_unset=partial)
+    await check_book_links(
+        session=session,
+        id_author=values.get("id_author"),
+        genres_ids=values.get("genres_ids"),
+    )
+    title: str = book.title
+    version: Optional[int] = None
     try:
-        for name, value in book_update.model_dump(exclude_unset=partial).items():
-            if name == "id_author" and await session.get(Author, value) is None:
-                logger.info("Not find author with id %s" % value)
-                raise ErrorInData(f"Not find author with id {value}")
-            elif name == "genres_ids":
-                for genre_id in value:
-                    if await session.get(Genre, genre_id) is None:
-                        logger.info("Not find genres with id %s" % genre_id)
-                        raise ErrorInData(f"Not find genres with id {genre_id}")
-                else:
-                    setattr(book, name, value)
-            else:
-                setattr(book, name, value)
+        for name, value in values.items():
+            setattr(book, name, value)
+        await bump_version(session=session, name=Book.__tablename__)
+        # Версия подсказок меняется только с названием, иначе другие
+        # воркеры перестраивали бы индекс после каждого изменения остатка
+        if book.title != title:
+            version = await bump_version(session=session, name=SUGGEST_VERSION)
         await session.commit()
 
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
         await session.rollback()
         raise ExceptDB(exc)
+    await response_cache.invalidate(cache_tag("book"), cache_tag("book", book.id))
+    if version is not None:
+        suggest_index.put("book", book.id, book.title, version)
     return book
 
 
@@ -134,69 +268,202 @@ async def delete_book_db(session: AsyncSession, book: Book) -> None:
     logger.info("Delete book by id %d" % book.id)
     try:
         await session.delete(book)
+        await bump_version(session=session, name=Book.__tablename__)
+        version: int = await bump_version(session=session, name=SUGGEST_VERSION)
         await session.commit()
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
         await session.rollback()
         raise ExceptDB(exc)
+    await response_cache.invalidate(cache_tag("book"), cache_tag("book", book.id))
+    suggest_index.discard("book", book.id, version)
+
+
+def search_query(find_text: str) -> Optional[ColumnElement]:
+    # Каждое слово ищем как префикс: и в русской морфологии, и без нее
+    words: list[str] = re.findall(r"\w+", find_text)
+    if not words:
+        return None
+    prefix_query: str = " & ".join(f"{word}:*" for word in words)
+    return func.to_tsquery("russian", prefix_query).op("||")(
+        func.to_tsquery("simple", prefix_query)
+    )
+
+
+async def get_books_facets(
+    session: AsyncSession, condition: ColumnElement[bool]
+) -> OutFacetsSchemas:
+    """
+    Количество книг по жанрам, авторам и десятилетиям выпуска
+    одним агрегирующим запросом (GROUPING SETS) по отобранным книгам
+    :param session: AsyncSession
+        сессия БД
+    :param condition: ColumnElement[bool]
+        условие отбора книг по модели чтения BookRead
+    :return: OutFacetsSchemas
+        фасеты, упорядоченные по убыванию количества
+    """
+    genre = (
+        func.unnest(BookRead.genres_ids, BookRead.genres)
+        .table_valued("id_genre", "title")
+        .render_derived("genre")
+        .lateral()
+    )
+    decade = cast(extract("year", BookRead.release_date), Integer) // 10 * 10
+    stmt = (
+        select(
+            genre.c.id_genre,
+            genre.c.title,
+            BookRead.author_id,
+            BookRead.author_full_name,
+            decade.label("decade"),
+            func.grouping(genre.c.id_genre).label("not_genre"),
+            func.grouping(BookRead.author_id).label("not_author"),
+            # книга с несколькими жанрами дает несколько строк после unnest
+            func.count(distinct(BookRead.id)).label("total"),
+        )
+        .select_from(BookRead)
+        .outerjoin(genre, true())
+        .filter(condition)
+        .group_by(
+            func.grouping_sets(
+                tuple_(genre.c.id_genre, genre.c.title),
+                tuple_(BookRead.author_id, BookRead.author_full_name),
+                tuple_(decade),
+            )
+        )
+    )
+    try:
+        result: Result = await session.execute(stmt)
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        raise ExceptDB(exc)
+
+    facets: OutFacetsSchemas = OutFacetsSchemas(genres=[], authors=[], decades=[])
+    for row in result.all():
+        if row.not_genre == 0:
+            if row.id_genre is not None:
+                facets.genres.append(
+                    GenreFacetSchemas(id=row.id_genre, title=row.title, count=row.total)
+                )
+        elif row.not_author == 0:
+            facets.authors.append(
+                AuthorFacetSchemas(
+                    id=row.author_id, full_name=row.author_full_name, count=row.total
+                )
+            )
+        else:
+            facets.decades.append(
+                DecadeFacetSchemas(decade=row.decade, count=row.total)
+            )
+
+    facets.genres.sort(key=lambda item: (-item.count, item.title))
+    facets.authors.sort(key=lambda item: (-item.count, item.full_name))
+    facets.decades.sort(key=lambda item: item.decade)
+    return facets
 
 
 async def find_books_title(
-    session: AsyncSession, text: BookFindSchemas
-) -> list[OutBookFoolSchemas]:
+    session: AsyncSession,
+    text: BookFindSchemas,
+    ranked: bool = False,
+    facets: bool = False,
+) -> FacetPage[OutBookFoolSchemas]:
     find_text: str = text.model_dump()["text"]
     logger.info("Start find books by title %s" % find_text)
-    try:
-        stmt = (
-            select(Book)
-            .filter(Book.title.ilike(f"%{find_text}%"))
-            .options(joinedload(Book.author))
-            .order_by(Book.id)
+
+    # ilike по title обслуживает триграммный индекс ix_books_read_title_trgm
+    condition = BookRead.title.ilike(f"%{find_text}%")
+    stmt = select(BookRead)
+    ts_query = search_query(find_text) if ranked else None
+    if ts_query is not None:
+        condition = or_(BookRead.search_vector.op("@@")(ts_query), condition)
+        stmt = stmt.filter(condition).order_by(
+            func.ts_rank_cd(BookRead.search_vector, ts_query).desc(), BookRead.id
         )
-        result: Result = await session.execute(stmt)
-        books = result.scalars().all()
+    else:
+        stmt = stmt.filter(condition).order_by(BookRead.id)
+    try:
+        with set_page(FacetPage[OutBookFoolSchemas]):
+            page: FacetPage = await paginate(session, stmt, transformer=books_to_schema)
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
-    else:
-        list_books = list()
-        for book in books:  # type: Book
-            list_books.append(await book_to_schema(session=session, book=book))
-
-        return list_books
+        raise ExceptDB(exc)
+    if facets:
+        page.facets = await get_books_facets(session=session, condition=condition)
+    return page
 
 
 async def find_books_author(
-    session: AsyncSession, text: BookFindSchemas
-) -> list[OutAuthorBooksSchemas]:
+    session: AsyncSession,
+    text: BookFindSchemas,
+    books_limit: int,
+    facets: bool = False,
+) -> FacetPage[OutAuthorBooksSchemas]:
     find_text: str = text.model_dump()["text"]
     logger.info("Start find books by author %s" % find_text)
-    try:
+
+    async def transformer(authors: Sequence[Author]) -> list[OutAuthorBooksSchemas]:
+        if not authors:
+            return list()
+        # Не более books_limit книг каждого автора страницы одним запросом
+        ranked = (
+            select(
+                BookRead.author_id,
+                BookRead.title,
+                BookRead.description,
+                BookRead.release_date,
+                BookRead.count,
+                func.row_number()
+                .over(partition_by=BookRead.author_id, order_by=BookRead.id)
+                .label("number"),
+                func.count().over(partition_by=BookRead.author_id).label("total"),
+            )
+            .filter(BookRead.author_id.in_([author.id for author in authors]))
+            .subquery()
+        )
         stmt = (
-            select(Author)
-            .filter(Author.full_name.ilike(f"%{find_text}%"))
-            .options(selectinload(Author.books))
-            .order_by(Author.id)
+            select(ranked)
+            .filter(ranked.c.number <= books_limit)
+            .order_by(ranked.c.author_id, ranked.c.number)
         )
         result: Result = await session.execute(stmt)
-        authors = result.scalars().all()
-    except SQLAlchemyError as exc:
-        logger.exception("Error in data base %s", exc)
-    else:
-        list_author_books = list()
-        for author in authors:
-            out_author = AuthorSchemas(id=author.id, full_name=author.full_name)
-            list_books = list()
-            for book in author.books:  # type: Book
-                out_book = OutBookShortSchemas(
-                    title=book.title,
-                    description=book.description,
-                    release_date=book.release_date,
-                    count=book.count,
+
+        author_books: dict[int, list[OutBookShortSchemas]] = dict()
+        author_total: dict[int, int] = dict()
+        for row in result.all():
+            author_books.setdefault(row.author_id, list()).append(
+                OutBookShortSchemas(
+                    title=row.title,
+                    description=row.description,
+                    release_date=row.release_date,
+                    count=row.count,
                 )
-                list_books.append(out_book)
+            )
+            author_total[row.author_id] = row.total
 
-            list_author_books.append(
-                OutAuthorBooksSchemas(author=out_author, books=list_books)
+        return [
+            OutAuthorBooksSchemas(
+                author=AuthorSchemas(id=author.id, full_name=author.full_name),
+                books=author_books.get(author.id, list()),
+                books_total=author_total.get(author.id, 0),
             )
+            for author in authors
+        ]
 
-        return list_author_books
+    # ilike по full_name обслуживает триграммный индекс ix_authors_full_name_trgm
+    stmt = (
+        select(Author)
+        .filter(Author.full_name.ilike(f"%{find_text}%"))
+        .order_by(Author.id)
+    )
+    try:
+        with set_page(FacetPage[OutAuthorBooksSchemas]):
+            page: FacetPage = await paginate(session, stmt, transformer=transformer)
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        raise ExceptDB(exc)
+    if facets:
+        condition = BookRead.author_full_name.ilike(f"%{find_text}%")
+        page.facets = await get_books_facets(session=session, condition=condition)
+    return page
@@ -0,0 +1,113 @@
+import csv
+import io
+import logging
+from typing import AsyncIterator, Literal, Sequence
+
+from sqlalchemy import Row, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.books.models import BookRead
+from src.books.schemas import AuthorSchemas, OutBookFoolSchemas
+from src.core.config import configure_logging, setting
+
+configure_logging(logging.INFO)
+logger = logging.getLogger(__name__)
+
+ExportFormat = Literal["ndjson", "csv"]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_HEADER = (
+    "id",
+    "title",
+    "description",
+    "author_id",
+    "author_full_name",
+    "release_date",
+    "count",
+    "genres",
+)
+
+
+def row_to_schema(row: Row) -> OutBookFoolSchemas:
+    return OutBookFoolSchemas(
+        id=row.id,
+        title=row.title,
+        description=row.description,
+        author=AuthorSchemas(id=row.author_id, full_name=row.author_full_name),
+        release_date=row.release_date,
+        count=row.count,
+        genres=row.genres,
+    )
+
+
+def chunk_to_ndjson(books: Sequence[OutBookFoolSchemas]) -> str:
+    return "".join(book.model_dump_json() + "\n" for book in books)
+
+
+def chunk_to_csv(books: Sequence[OutBookFoolSchemas]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for book in books:
+        writer.writerow(
+            (
+                book.id,
+                book.title,
+                book.description,
+                book.author.id,
+                book.author.full_name,
+                book.release_date.isoformat(),
+                book.count,
+                ";".join(book.genres),
+            )
+        )
+    return buffer.getvalue()
+
+
+async def export_books(
+    session_maker: async_sessionmaker[AsyncSession], fmt: ExportFormat
+) -> AsyncIterator[str]:
+    """
+    Выгрузка каталога (OutBookFoolSchemas) через серверный курсор:
+    в памяти одновременно находится не больше одной пачки книг.
+    Генератор открывает собственную сессию, так как выполняется
+    уже после завершения зависимостей запроса
+    :param session_maker: async_sessionmaker[AsyncSession]
+        фабрика сессий базы данных
+    :param fmt: ExportFormat
+        формат выгрузки: ndjson или csv
+    :return: AsyncIterator[str]
+        части выгрузки
+    """
+    logger.info("Start export books to %s" % fmt)
+    chunk_size: int = setting.books_export.chunk_size
+    to_text = chunk_to_csv if fmt == "csv" else chunk_to_ndjson
+    if fmt == "csv":
+        yield ",".join(CSV_HEADER) + "\r\n"
+
+    stmt = (
+        select(
+            BookRead.id,
+            BookRead.title,
+            BookRead.description,
+            BookRead.author_id,
+            BookRead.author_full_name,
+            BookRead.release_date,
+            BookRead.count,
+            BookRead.genres,
+        )
+        .order_by(BookRead.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    exported: int = 0
+    async with session_maker() as session:
+        try:
+            result = await session.stream(stmt)
+            async for rows in result.partitions():
+                books = [row_to_schema(row=row) for row in rows]
+                exported += len(books)
+                yield to_text(books)
+        except SQLAlchemyError as exc:
+            # Заголовки ответа уже отправлены, поэтому обрываем выгрузку
+            logger.exception("Error in data base %s", exc)
+            raise
+    logger.info("Exported %d books" % exported)
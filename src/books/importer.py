@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import logging
+from collections import deque
+from datetime import datetime, time
+from typing import AsyncIterable, AsyncIterator, Literal, Optional, get_args
+
+from asyncpg import InterfaceError, NumericValueOutOfRangeError, PostgresError
+from pydantic import ValidationError
+from sqlalchemy import (
+    ARRAY,
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    delete,
+    exists,
+    func,
+    insert,
+    not_,
+    or_,
+    select,
+)
+from sqlalchemy.engine import Result
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.authors.models import Author
+from src.books.crud import links_error_message
+from src.books.models import Book
+from src.books.suggest import SUGGEST_VERSION, suggest_index
+from src.books.schemas import (
+    BookCreateSchemas,
+    ImportErrorSchemas,
+    OutImportSchemas,
+)
+from src.core.cache import cache_tag, response_cache
+from src.core.config import configure_logging, setting
+from src.core.database import async_session_maker
+from src.core.versions import bump_version
+from src.core.exceptions import ErrorInData, ExceptDB
+from src.genres.models import Genre
+
+configure_logging(logging.INFO)
+logger = logging.getLogger(__name__)
+
+ImportFormat = Literal["csv", "jsonl"]
+IMPORT_FORMATS = get_args(ImportFormat)
+
+# Промежуточная таблица живет до конца транзакции импорта
+books_import = Table(
+    "books_import",
+    MetaData(),
+    Column("line", Integer, primary_key=True),
+    Column("title", String(100)),
+    Column("description", String(250)),
+    Column("release_date", DateTime),
+    Column("count", Integer),
+    Column("id_author", Integer),
+    Column("genres_ids", ARRAY(Integer)),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail: str = ""
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+class CsvRecords:
+    """
+    Один csv.reader на весь файл. Физические строки передаются по одной
+    и копятся, пока не закроются кавычки: запись с переводом строки
+    в поле в кавычках разбирается целиком, номера строк дает reader.line_num
+    """
+
+    def __init__(self):
+        self.start: int = 0  # первая физическая строка последней записи
+        self._lines: deque[str] = deque()
+        self._quoted: bool = False
+        self._reader = csv.reader(self)
+
+    def __iter__(self) -> "CsvRecords":
+        return self
+
+    def __next__(self) -> str:
+        if not self._lines:
+            raise StopIteration
+        return self._lines.popleft()
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._lines)
+
+    def push(self, line: str) -> Optional[list[str]]:
+        """
+        :return: Optional[list[str]]
+            поля записи или None, если запись продолжается на следующей строке
+        """
+        if not self._lines:
+            self.start = self._reader.line_num + 1
+        self._lines.append(line + "\n")
+        if line.count('"') % 2:
+            self._quoted = not self._quoted
+        if self._quoted:
+            return None
+        return next(self._reader, [])
+
+
+def parse_csv_row(values: list[str], header: list[str]) -> dict:
+    if len(values) != len(header):
+        raise ErrorInData(f"Expected {len(header)} columns, got {len(values)}")
+    row: dict = dict(zip(header, values))
+    genres_ids: str = row.get("genres_ids", "").strip()
+    row["genres_ids"] = [value for value in genres_ids.split(";") if value.strip()]
+    return row
+
+
+def parse_jsonl_line(line: str) -> dict:
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ErrorInData(f"Invalid JSON: {exc}")
+    if not isinstance(row, dict):
+        raise ErrorInData("Invalid JSON: expected an object")
+    return row
+
+
+def book_to_record(line: int, book: BookCreateSchemas) -> tuple:
+    return (
+        line,
+        book.title,
+        book.description,
+        datetime.combine(book.release_date, time()),
+        book.count,
+        book.id_author,
+        book.genres_ids,
+    )
+
+
+async def copy_records(session: AsyncSession, records: list[tuple]) -> None:
+    # COPY идет через соединение asyncpg мимо SQLAlchemy: его ошибки
+    # приходят как PostgresError и InterfaceError, а не SQLAlchemyError
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    try:
+        await raw_connection.driver_connection.copy_records_to_table(
+            books_import.name,
+            records=records,
+            columns=[column.name for column in books_import.columns],
+        )
+    except OverflowError as exc:
+        # Число вне integer кодировщик COPY не оборачивает в ошибку asyncpg
+        raise NumericValueOutOfRangeError(f"{exc}")
+
+
+async def import_books(
+    session: AsyncSession, lines: AsyncIterable[str], fmt: ImportFormat
+) -> OutImportSchemas:
+    """
+    Потоковый импорт книг: строки проверяются по схеме, пачками копируются
+    во временную таблицу (COPY), ссылки на авторов и жанры проверяются
+    одним запросом для всей загрузки
+    :param session: AsyncSession
+        сессия базы данных
+    :param lines: AsyncIterable[str]
+        строки файла импорта
+    :param fmt: ImportFormat
+        формат файла: csv (первая строка - заголовок, жанры через ";") или jsonl
+    :return: OutImportSchemas
+        количество загруженных книг и ошибки по строкам
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ErrorInData(f"Unknown import format {fmt}")
+    logger.info("Start import books from %s" % fmt)
+    max_errors: int = setting.books_import.max_errors
+    errors: list[ImportErrorSchemas] = list()
+    errors_total: int = 0
+
+    def add_error(line: int, detail: str) -> None:
+        nonlocal errors_total
+        errors_total += 1
+        if len(errors) < max_errors:
+            errors.append(ImportErrorSchemas(line=line, detail=detail))
+
+    try:
+        connection = await session.connection()
+        await connection.run_sync(books_import.create)
+
+        header: Optional[list[str]] = None
+        csv_records = CsvRecords()
+        records: list[tuple] = list()
+        number: int = 0
+        async for line in lines:
+            number += 1
+            line_number: int = number
+            values: Optional[list[str]] = None
+            if fmt == "csv":
+                values = csv_records.push(line)
+                if values is None:
+                    continue
+                line_number = csv_records.start
+            if not line.strip() and not values:
+                continue
+            if fmt == "csv" and header is None:
+                header = [name.strip() for name in values]
+                continue
+            try:
+                if fmt == "csv":
+                    row = parse_csv_row(values=values, header=header)
+                else:
+                    row = parse_jsonl_line(line=line)
+                book = BookCreateSchemas.model_validate(row)
+            except ErrorInData as exc:
+                add_error(line_number, f"{exc}")
+            except ValidationError as exc:
+                add_error(
+                    line_number, "; ".join(error["msg"] for error in exc.errors())
+                )
+            else:
+                records.append(book_to_record(line=line_number, book=book))
+                if len(records) >= setting.books_import.chunk_size:
+                    await copy_records(session=session, records=records)
+                    records = list()
+        if csv_records.pending:
+            add_error(csv_records.start, "Unterminated quoted field")
+        if records:
+            await copy_records(session=session, records=records)
+
+        # Ссылки на авторов и жанры проверяем для всей загрузки сразу:
+        # строки с ошибками удаляются из временной таблицы одним запросом
+        genre_id = func.unnest(books_import.c.genres_ids).column_valued("genre_id")
+        not_genre = not_(exists().where(Genre.id == genre_id))
+        author_exists = exists().where(Author.id == books_import.c.id_author)
+        stmt = (
+            delete(books_import)
+            .where(or_(not_(author_exists), exists(select(genre_id).where(not_genre))))
+            .returning(
+                books_import.c.line,
+                books_import.c.id_author,
+                author_exists.label("author_exists"),
+                select(func.array_agg(genre_id))
+                .where(not_genre)
+                .scalar_subquery()
+                .label("missing_genres"),
+            )
+        )
+        result: Result = await session.execute(stmt)
+        for row in result.all():
+            add_error(
+                row.line,
+                links_error_message(
+                    id_author=row.id_author,
+                    author_exists=row.author_exists,
+                    missing_genres=row.missing_genres,
+                ),
+            )
+
+        columns: list[str] = [
+            "title",
+            "description",
+            "release_date",
+            "count",
+            "id_author",
+            "genres_ids",
+        ]
+        stmt = insert(Book).from_select(
+            columns,
+            select(*[books_import.c[column] for column in columns]).order_by(
+                books_import.c.line
+            ),
+        )
+        result: Result = await session.execute(stmt)
+        imported: int = result.rowcount
+        if imported:
+            await bump_version(session=session, name=Book.__tablename__)
+            await bump_version(session=session, name=SUGGEST_VERSION)
+        await session.commit()
+    except (SQLAlchemyError, PostgresError, InterfaceError) as exc:
+        logger.exception("Error in data base %s", exc)
+        await session.rollback()
+        raise ExceptDB(exc)
+    if imported:
+        await response_cache.invalidate(cache_tag("book"))
+        # Новых названий может быть много: индекс перестраивается в фоне
+        suggest_index.schedule_reload(session=session)
+
+    logger.info("Imported %d books, %d errors" % (imported, errors_total))
+    errors.sort(key=lambda error: error.line)
+    return OutImportSchemas(imported=imported, errors_total=errors_total, errors=errors)
+
+
+async def iter_file_lines(path: str) -> AsyncIterator[str]:
+    with open(path, encoding="utf-8-sig") as file:
+        for line in file:
+            yield line.rstrip("\r\n")
+
+
+async def main(path: str, fmt: str) -> None:
+    async with async_session_maker() as session:
+        result: OutImportSchemas = await import_books(
+            session=session, lines=iter_file_lines(path), fmt=fmt
+        )
+    print(result.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import of books")
+    parser.add_argument("path", help="CSV or JSONL file")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default="csv")
+    args = parser.parse_args()
+    asyncio.run(main(path=args.path, fmt=args.format))
@@ -1,6 +1,17 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, String, Integer, ForeignKey, ARRAY
+from sqlalchemy import (
+    DDL,
+    DateTime,
+    String,
+    Integer,
+    ForeignKey,
+    ARRAY,
+    Computed,
+    Index,
+    event,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.database import Base
@@ -27,3 +38,125 @@ class Book(Base):
 
     def __str__(self):
         return f"Book id:{self.id} title: {self.title} release date:{self.release_date}"
+
+
+class BookRead(Base):
+    """
+    Модель чтения книги для списков и поиска: имя автора и названия жанров
+    уже подставлены. Строки поддерживают триггеры на books, authors и genre
+    в той же транзакции, что и изменение исходных данных.
+    """
+
+    __tablename__ = "books_read"
+    __table_args__ = (
+        Index("ix_books_read_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_books_read_genres_ids", "genres_ids", postgresql_using="gin"),
+    )
+
+    id: Mapped[int] = mapped_column(
+        ForeignKey("books.id", ondelete="CASCADE"), primary_key=True
+    )
+    title: Mapped[str] = mapped_column(String(100))
+    description: Mapped[str] = mapped_column(String(250))
+    release_date: Mapped[DateTime] = mapped_column(DateTime)
+    count: Mapped[int] = mapped_column(Integer)
+    author_id: Mapped[int] = mapped_column(Integer, index=True)
+    author_full_name: Mapped[str]
+    genres_ids: Mapped[list] = mapped_column(ARRAY(Integer), nullable=False)
+    genres: Mapped[list] = mapped_column(ARRAY(String), nullable=False)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('russian', title) || to_tsvector('simple', title)",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
+
+# Тексты функций и триггеров повторены в миграции, создавшей books_read
+BOOKS_READ_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION books_read_genres(ids integer[]) RETURNS varchar[] AS $$
+        SELECT coalesce(array_agg(coalesce(g.title, 'отсутствует') ORDER BY u.n), '{}')
+        FROM unnest(ids) WITH ORDINALITY AS u(id, n)
+        LEFT JOIN genre AS g ON g.id = u.id
+    $$ LANGUAGE sql STABLE
+    """,
+    """
+    CREATE OR REPLACE FUNCTION books_read_sync_book() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO books_read (
+            id, title, description, release_date, count,
+            author_id, author_full_name, genres_ids, genres
+        )
+        SELECT NEW.id, NEW.title, NEW.description, NEW.release_date, NEW.count,
+            NEW.id_author, a.full_name, NEW.genres_ids,
+            books_read_genres(NEW.genres_ids)
+        FROM authors AS a
+        WHERE a.id = NEW.id_author
+        ON CONFLICT (id) DO UPDATE SET
+            title = EXCLUDED.title,
+            description = EXCLUDED.description,
+            release_date = EXCLUDED.release_date,
+            count = EXCLUDED.count,
+            author_id = EXCLUDED.author_id,
+            author_full_name = EXCLUDED.author_full_name,
+            genres_ids = EXCLUDED.genres_ids,
+            genres = EXCLUDED.genres;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION books_read_sync_author() RETURNS trigger AS $$
+    BEGIN
+        UPDATE books_read SET author_full_name = NEW.full_name
+        WHERE author_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION books_read_sync_genre() RETURNS trigger AS $$
+    DECLARE
+        genre_id integer;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            genre_id := OLD.id;
+        ELSE
+            genre_id := NEW.id;
+        END IF;
+        UPDATE books_read SET genres = books_read_genres(genres_ids)
+        WHERE genres_ids @> ARRAY[genre_id];
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER books_read_sync AFTER INSERT OR UPDATE ON books
+    FOR EACH ROW EXECUTE FUNCTION books_read_sync_book()
+    """,
+    """
+    CREATE TRIGGER books_read_sync AFTER UPDATE OF full_name ON authors
+    FOR EACH ROW WHEN (OLD.full_name IS DISTINCT FROM NEW.full_name)
+    EXECUTE FUNCTION books_read_sync_author()
+    """,
+    """
+    CREATE TRIGGER books_read_sync AFTER INSERT OR UPDATE OR DELETE ON genre
+    FOR EACH ROW EXECUTE FUNCTION books_read_sync_genre()
+    """,
+)
+
+BOOKS_READ_DROP_DDL = (
+    "DROP FUNCTION IF EXISTS books_read_sync_book() CASCADE",
+    "DROP FUNCTION IF EXISTS books_read_sync_author() CASCADE",
+    "DROP FUNCTION IF EXISTS books_read_sync_genre() CASCADE",
+    "DROP FUNCTION IF EXISTS books_read_genres(integer[])",
+)
+
+# Триггеры ссылаются на несколько таблиц, поэтому создаются после всей схемы
+for statement in BOOKS_READ_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement))
+for statement in BOOKS_READ_DROP_DDL:
+    event.listen(Base.metadata, "after_drop", DDL(statement))
@@ -1,29 +1,40 @@
-from typing import TYPE_CHECKING
+from typing import Optional, TYPE_CHECKING, Union
 
-from fastapi import APIRouter, Depends, status, Response
-from fastapi_pagination import Page, paginate
+from fastapi import APIRouter, Depends, Query, Request, status, Response
+from fastapi.responses import StreamingResponse
+from fastapi_pagination import Page
 from fastapi.exceptions import HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from src.core.database import get_async_session
+from src.core.cache import cache_tag, request_key, response_cache
+from src.core.database import get_async_session, get_async_session_maker
+from src.core.etag import etag_for
 from src.core.exceptions import (
     ErrorInData,
     ExceptDB,
 )
 from src.books.crud import (
+    BOOK_COUNT_VERSIONS,
+    GenreMatch,
     create_book,
     get_books,
+    get_books_cursor,
     update_book_db,
     delete_book_db,
     find_books_title,
     find_books_author,
 )
 from src.books.dependencies import book_by_id
+from src.books.exporter import EXPORT_MEDIA_TYPES, ExportFormat, export_books
+from src.books.importer import ImportFormat, import_books, iter_lines
+from src.books.suggest import suggest_index
 from src.users.depends import (
     current_superuser_user,
     current_user_authorization,
 )
+from src.authors.models import Author
 from src.books.models import Book
+from src.genres.models import Genre
 from src.books.schemas import (
     BookUpdateSchemas,
     BookUpdatePartialSchemas,
@@ -32,6 +43,10 @@ from src.books.schemas import (
     OutBookFoolSchemas,
     BookFindSchemas,
     OutAuthorBooksSchemas,
+    OutBooksCursorSchemas,
+    OutImportSchemas,
+    FacetPage,
+    OutSuggestSchemas,
 )
 
 if TYPE_CHECKING:
@@ -39,6 +54,30 @@ if TYPE_CHECKING:
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
+# Полное описание книги зависит от книг, их остатков, авторов и жанров
+catalog_etag = etag_for(
+    Book.__tablename__,
+    *BOOK_COUNT_VERSIONS,
+    Author.__tablename__,
+    Genre.__tablename__,
+)
+
+
+def books_tags(result: Union[Page, OutBooksCursorSchemas]) -> list[str]:
+    tags: list[str] = [cache_tag("book"), cache_tag("genre")]
+    for book in result.items:  # type: OutBookFoolSchemas
+        tags += [cache_tag("book", book.id), cache_tag("author", book.author.id)]
+    if getattr(result, "facets", None) is not None:
+        tags += [cache_tag("author", author.id) for author in result.facets.authors]
+    return tags
+
+
+def authors_books_tags(result: Page) -> list[str]:
+    tags: list[str] = [cache_tag("author"), cache_tag("book")]
+    for item in result.items:  # type: OutAuthorBooksSchemas
+        tags.append(cache_tag("author", item.author.id))
+    return tags
+
 
 @router.post("/new", response_model=OutBookSchemas, status_code=status.HTTP_201_CREATED)
 async def new_book(
@@ -62,21 +101,136 @@ async def new_book(
         return result
 
 
+@router.post(
+    "/import", response_model=OutImportSchemas, status_code=status.HTTP_201_CREATED
+)
+async def import_books_file(
+    request: Request,
+    format: ImportFormat = Query("csv"),
+    session: AsyncSession = Depends(get_async_session),
+    user: "User" = Depends(current_superuser_user),
+):
+    try:
+        result: OutImportSchemas = await import_books(
+            session=session, lines=iter_lines(request.stream()), fmt=format
+        )
+    except ExceptDB:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Error in data bases",
+        )
+    except ErrorInData as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    else:
+        return result
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_books_file(
+    format: ExportFormat = Query("ndjson"),
+    session_maker: async_sessionmaker[AsyncSession] = Depends(get_async_session_maker),
+    user: "User" = Depends(current_superuser_user),
+):
+    return StreamingResponse(
+        export_books(session_maker=session_maker, fmt=format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="books.{format}"'},
+    )
+
+
 @router.get(
     "/list",
     response_model=Page[OutBookFoolSchemas],
     status_code=status.HTTP_200_OK,
 )
 async def get_list_books(
+    request: Request,
+    genre_ids: Optional[list[int]] = Query(None),
+    genre_match: GenreMatch = Query("any"),
     session: AsyncSession = Depends(get_async_session),
     user: "User" = Depends(current_user_authorization),
+    etag: None = Depends(catalog_etag),
 ):
-    return paginate(await get_books(session=session))
+    try:
+        result = await response_cache.get_or_set(
+            key=request_key(request),
+            factory=lambda: get_books(
+                session=session, genre_ids=genre_ids, genre_match=genre_match
+            ),
+            tags=books_tags,
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    return result
+
+
+@router.get(
+    "/list/cursor",
+    response_model=OutBooksCursorSchemas,
+    status_code=status.HTTP_200_OK,
+)
+async def get_list_books_cursor(
+    request: Request,
+    cursor: Optional[int] = Query(None, ge=0),
+    size: int = Query(50, ge=1, le=100),
+    genre_ids: Optional[list[int]] = Query(None),
+    genre_match: GenreMatch = Query("any"),
+    session: AsyncSession = Depends(get_async_session),
+    user: "User" = Depends(current_user_authorization),
+    etag: None = Depends(catalog_etag),
+):
+    try:
+        result = await response_cache.get_or_set(
+            key=request_key(request),
+            factory=lambda: get_books_cursor(
+                session=session,
+                cursor=cursor,
+                size=size,
+                genre_ids=genre_ids,
+                genre_match=genre_match,
+            ),
+            tags=books_tags,
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    return result
+
+
+@router.get(
+    "/suggest",
+    response_model=list[OutSuggestSchemas],
+    status_code=status.HTTP_200_OK,
+)
+async def suggest_books(
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    session: AsyncSession = Depends(get_async_session),
+    user: "User" = Depends(current_user_authorization),
+):
+    # Подсказки из префиксного индекса в памяти, без поиска по таблицам
+    try:
+        result = await suggest_index.suggest(session=session, text=q, limit=limit)
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    return result
 
 
 @router.get("/{book_id}/", response_model=OutBookSchemas)
 async def get_book(
     user: "User" = Depends(current_user_authorization),
+    etag: None = Depends(etag_for(Book.__tablename__, *BOOK_COUNT_VERSIONS)),
     book: Book = Depends(book_by_id),
 ):
     return book
@@ -135,20 +289,51 @@ async def delete_book(
         )
 
 
-@router.post("/title", response_model=Page[OutBookFoolSchemas])
+@router.post("/title", response_model=FacetPage[OutBookFoolSchemas])
 async def find_book_by_title(
+    request: Request,
     text: BookFindSchemas,
+    ranked: bool = Query(False),
+    facets: bool = Query(False),
     user: "User" = Depends(current_user_authorization),
     session: AsyncSession = Depends(get_async_session),
 ):
-    return paginate(await find_books_title(session=session, text=text))
+    try:
+        result = await response_cache.get_or_set(
+            key=request_key(request, text),
+            factory=lambda: find_books_title(
+                session=session, text=text, ranked=ranked, facets=facets
+            ),
+            tags=books_tags,
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    return result
 
 
-@router.post("/author", response_model=Page[OutAuthorBooksSchemas])
+@router.post("/author", response_model=FacetPage[OutAuthorBooksSchemas])
 async def find_book_by_author(
+    request: Request,
     text: BookFindSchemas,
+    books_limit: int = Query(10, ge=1, le=100),
+    facets: bool = Query(False),
     user: "User" = Depends(current_user_authorization),
     session: AsyncSession = Depends(get_async_session),
 ):
-
-    return paginate(await find_books_author(session=session, text=text))
+    try:
+        result = await response_cache.get_or_set(
+            key=request_key(request, text),
+            factory=lambda: find_books_author(
+                session=session, text=text, books_limit=books_limit, facets=facets
+            ),
+            tags=authors_books_tags,
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    return result
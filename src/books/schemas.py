@@ -1,7 +1,10 @@
 from datetime import date
-from typing import Optional
+from typing import Generic, Optional, TypeVar
 
-from pydantic import BaseModel, ConfigDict, Field
+from fastapi_pagination import Page
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+T = TypeVar("T")
 
 
 class BookBaseSchemas(BaseModel):
@@ -12,6 +15,13 @@ class BookBaseSchemas(BaseModel):
     id_author: int = Field(ge=0)
     genres_ids: list[int]
 
+    @field_validator("genres_ids")
+    def genres_ids_unique(cls, value):
+        # Повтор жанра ломает счетчики circulation_stats по жанрам
+        if value is None:
+            return value
+        return list(dict.fromkeys(value))
+
 
 class BookUpdateSchemas(BookBaseSchemas):
     pass
@@ -59,6 +69,11 @@ class OutBookFoolSchemas(BaseModel):
     genres: list[str]
 
 
+class OutBooksCursorSchemas(BaseModel):
+    items: list[OutBookFoolSchemas]
+    next_cursor: Optional[int]
+
+
 class OutBookShortSchemas(BaseModel):
     title: str
     description: str
@@ -69,3 +84,48 @@ class OutBookShortSchemas(BaseModel):
 class OutAuthorBooksSchemas(BaseModel):
     author: AuthorSchemas
     books: list[OutBookShortSchemas]
+    books_total: int
+
+
+class GenreFacetSchemas(BaseModel):
+    id: int
+    title: str
+    count: int
+
+
+class AuthorFacetSchemas(BaseModel):
+    id: int
+    full_name: str
+    count: int
+
+
+class DecadeFacetSchemas(BaseModel):
+    decade: int
+    count: int
+
+
+class OutFacetsSchemas(BaseModel):
+    genres: list[GenreFacetSchemas]
+    authors: list[AuthorFacetSchemas]
+    decades: list[DecadeFacetSchemas]
+
+
+class FacetPage(Page[T], Generic[T]):
+    facets: Optional[OutFacetsSchemas] = None
+
+
+class OutSuggestSchemas(BaseModel):
+    kind: str  # book или author
+    id: int
+    text: str
+
+
+class ImportErrorSchemas(BaseModel):
+    line: int
+    detail: str
+
+
+class OutImportSchemas(BaseModel):
+    imported: int
+    errors_total: int
+    errors: list[ImportErrorSchemas]
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import re
+import time
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Result
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.authors.models import Author
+from src.books.models import Book
+from src.books.schemas import OutSuggestSchemas
+from src.core.config import configure_logging, setting
+from src.core.exceptions import ExceptDB
+from src.core.versions import get_version
+
+configure_logging(logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Версия названий книг и имен авторов, по которой воркеры узнают о чужих изменениях
+SUGGEST_VERSION = "suggest"
+SORT_RUN = 20000
+
+
+def normalize(text: str) -> str:
+    return text.casefold().replace("ё", "е")
+
+
+def prefix_keys(text: str) -> list[str]:
+    # "Евгений Онегин" находится и по "евг", и по "оне"
+    value: str = normalize(text)
+    return sorted({value[match.start() :] for match in re.finditer(r"\w+", value)})
+
+
+def build_index(
+    rows: list[tuple[str, int, str]],
+) -> tuple[list[tuple[str, str, int]], dict[tuple[str, int], str]]:
+    # Ключи сортируются частями по SORT_RUN и сливаются: list.sort не отпускает
+    # GIL, и одна сортировка всего индекса задержала бы цикл событий
+    texts: dict[tuple[str, int], str] = dict()
+    runs: list[list[tuple[str, str, int]]] = list()
+    keys: list[tuple[str, str, int]] = list()
+    for kind, object_id, text in rows:
+        texts[(kind, object_id)] = text
+        keys += [(key, kind, object_id) for key in prefix_keys(text)]
+        if len(keys) >= SORT_RUN:
+            keys.sort()
+            runs.append(keys)
+            keys = list()
+    keys.sort()
+    runs.append(keys)
+    return list(merge(*runs)), texts
+
+
+class SuggestIndex:
+    """
+    Префиксный индекс названий книг и имен авторов в памяти процесса:
+    отсортированный список ключей, поиск по префиксу через bisect.
+    CRUD книг и авторов обновляют индекс на месте; изменения из других
+    воркеров видны не позднее check_interval секунд по версии suggest.
+    Устаревший индекс перестраивается в фоновой задаче, построение
+    ключей идет в отдельном потоке, запросы до замены видят прежний индекс.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self.version: Optional[int] = None
+        self._keys: list[tuple[str, str, int]] = list()
+        self._texts: dict[tuple[str, int], str] = dict()
+        self._checked_at: float = 0.0
+        self._lock = asyncio.Lock()
+        self._reload_task: Optional[asyncio.Task] = None
+
+    async def load(self, session: AsyncSession) -> None:
+        version: int = await get_version(session=session, name=SUGGEST_VERSION)
+        books: Result = await session.execute(select(Book.id, Book.title))
+        authors: Result = await session.execute(select(Author.id, Author.full_name))
+        rows: list[tuple[str, int, str]] = [
+            ("book", object_id, text) for object_id, text in books.all()
+        ] + [("author", object_id, text) for object_id, text in authors.all()]
+
+        keys, texts = await asyncio.to_thread(build_index, rows)
+
+        self._keys, self._texts = keys, texts
+        self.version = version
+        self._checked_at = time.monotonic()
+        logger.info("Suggest index loaded, version %s, %d keys" % (version, len(keys)))
+
+    def schedule_reload(self, session: AsyncSession) -> None:
+        """
+        Запускает перестройку индекса в фоне, если она еще не идет.
+        Задача работает в своей сессии на том же движке, что и session
+        """
+        if self._reload_task is not None and not self._reload_task.done():
+            return
+        session_maker = async_sessionmaker(session.bind, expire_on_commit=False)
+        self._reload_task = asyncio.create_task(self._reload(session_maker))
+
+    def put(self, kind: str, object_id: int, text: str, version: int) -> None:
+        """
+        Добавляет или заменяет запись после коммита
+        :param version: int
+            версия suggest, которую вернул bump_version в этой транзакции
+        """
+        self._remove(kind, object_id)
+        self._texts[(kind, object_id)] = text
+        for key in prefix_keys(text):
+            insort(self._keys, (key, kind, object_id))
+        self._advance(version)
+
+    def discard(self, kind: str, object_id: int, version: int) -> None:
+        self._remove(kind, object_id)
+        self._advance(version)
+
+    def search(self, text: str, limit: int) -> list[OutSuggestSchemas]:
+        prefix: str = normalize(text.strip())
+        found: list[OutSuggestSchemas] = list()
+        seen: set[tuple[str, int]] = set()
+        index: int = bisect_left(self._keys, (prefix,))
+        while index < len(self._keys) and len(found) < limit:
+            key, kind, object_id = self._keys[index]
+            if not key.startswith(prefix):
+                break
+            if (kind, object_id) not in seen:
+                seen.add((kind, object_id))
+                found.append(
+                    OutSuggestSchemas(
+                        kind=kind, id=object_id, text=self._texts[(kind, object_id)]
+                    )
+                )
+            index += 1
+        return found
+
+    async def suggest(
+        self, session: AsyncSession, text: str, limit: int
+    ) -> list[OutSuggestSchemas]:
+        try:
+            if self.version is None:
+                # Первое обращение без загрузки в lifespan: индекса еще нет
+                async with self._lock:
+                    if self.version is None:
+                        await self.load(session=session)
+            elif time.monotonic() - self._checked_at >= self.check_interval:
+                self._checked_at = time.monotonic()
+                version: int = await get_version(session=session, name=SUGGEST_VERSION)
+                if version != self.version:
+                    logger.info(
+                        "Suggest index is stale (%s != %s)" % (self.version, version)
+                    )
+                    self.schedule_reload(session=session)
+        except SQLAlchemyError as exc:
+            logger.exception("Error in data base %s", exc)
+            raise ExceptDB(exc)
+        return self.search(text=text, limit=limit)
+
+    def _remove(self, kind: str, object_id: int) -> None:
+        text: Optional[str] = self._texts.pop((kind, object_id), None)
+        if text is None:
+            return
+        for key in prefix_keys(text):
+            index: int = bisect_left(self._keys, (key, kind, object_id))
+            if index < len(self._keys) and self._keys[index] == (key, kind, object_id):
+                del self._keys[index]
+
+    def _advance(self, version: int) -> None:
+        # Между нашей и предыдущей версией были чужие изменения:
+        # оставляем старую версию, и следующая проверка перечитает индекс
+        if self.version is not None and version == self.version + 1:
+            self.version = version
+
+    async def _reload(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        try:
+            async with session_maker() as session:
+                await self.load(session=session)
+        except Exception as exc:
+            # Индекс остается прежним, следующая проверка версии повторит попытку
+            logger.exception("Suggest index reload failed %s", exc)
+
+
+suggest_index = SuggestIndex(check_interval=setting.cache.suggest_check_interval)
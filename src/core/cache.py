@@ -0,0 +1,186 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional, Protocol, Union
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from src.core.config import configure_logging, setting
+
+configure_logging(logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def cache_tag(name: str, object_id: Union[int, str] = "*") -> str:
+    """
+    Тег записи кеша: "book:5" - конкретная книга, "book:*" - состав списков книг
+    """
+    return f"{name}:{object_id}"
+
+
+def request_key(request: Request, body: Optional[BaseModel] = None) -> str:
+    query: str = "&".join(sorted(request.url.query.split("&")))
+    key: str = f"{request.method}:{request.url.path}?{query}"
+    if body is not None:
+        key += f":{body.model_dump_json()}"
+    return key
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> Optional[Any]: ...
+
+    async def set(self, key: str, value: Any, tags: set[str], ttl: float) -> None: ...
+
+    async def invalidate(self, tags: Iterable[str]) -> None: ...
+
+
+class LocalCache:
+    """
+    LRU кеш процесса с временем жизни записей и индексом тег -> ключи
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, set[str], Any]] = OrderedDict()
+        self._tags: dict[str, set[str]] = dict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, tags: set[str], ttl: float) -> None:
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, tags, value)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            for key in self._tags.pop(tag, set()):
+                self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class SharedCache:
+    """
+    Общий для воркеров кеш поверх клиента с интерфейсом redis.asyncio
+    (get, set с ex, mget, incr). Ключи по тегу не перебираются: у каждого
+    тега есть счетчик версии, запись хранит версии своих тегов и считается
+    устаревшей, если хотя бы один счетчик изменился
+    """
+
+    def __init__(self, client: Any, prefix: str = "library:cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    async def _tag_versions(self, tags: list[str]) -> list[int]:
+        if not tags:
+            return list()
+        values = await self.client.mget([self._tag_key(tag) for tag in tags])
+        return [int(value or 0) for value in values]
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(f"{self.prefix}{key}")
+        if raw is None:
+            return None
+        entry: dict = json.loads(raw)
+        tags: list[str] = list(entry["tags"])
+        if await self._tag_versions(tags) != [entry["tags"][tag] for tag in tags]:
+            return None
+        return entry["value"]
+
+    async def set(self, key: str, value: Any, tags: set[str], ttl: float) -> None:
+        tags_list: list[str] = sorted(tags)
+        versions: list[int] = await self._tag_versions(tags_list)
+        entry: dict = {"tags": dict(zip(tags_list, versions)), "value": value}
+        await self.client.set(
+            f"{self.prefix}{key}", json.dumps(entry), ex=max(int(ttl), 1)
+        )
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            await self.client.incr(self._tag_key(tag))
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        tags: Callable[[Any], Iterable[str]],
+    ) -> Any:
+        """
+        Возвращает ответ из кеша или вычисляет его и сохраняет с тегами
+        :param key: str
+            ключ записи (путь, параметры и тело запроса)
+        :param factory: Callable[[], Awaitable[Any]]
+            вычисление ответа
+        :param tags: Callable[[Any], Iterable[str]]
+            теги записи по вычисленному ответу
+        :return: Any
+            ответ, пригодный для сериализации в JSON
+        """
+        try:
+            value = await self.backend.get(key)
+        except Exception as exc:
+            logger.warning("Response cache is unavailable: %s", exc)
+            return jsonable_encoder(await factory())
+        if value is not None:
+            return value
+        result = await factory()
+        value = jsonable_encoder(result)
+        try:
+            await self.backend.set(key, value, set(tags(result)), self.ttl)
+        except Exception as exc:
+            logger.warning("Response cache is unavailable: %s", exc)
+        return value
+
+    async def invalidate(self, *tags: str) -> None:
+        logger.info("Invalidate response cache tags %s" % ", ".join(tags))
+        try:
+            await self.backend.invalidate(tags)
+        except Exception as exc:
+            logger.warning("Response cache is unavailable: %s", exc)
+
+
+def create_backend() -> CacheBackend:
+    if setting.cache.response_backend == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logger.warning("Package redis is not installed, using local cache")
+        else:
+            return SharedCache(client=redis.from_url(setting.cache.redis_url))
+    return LocalCache(max_entries=setting.cache.response_max_entries)
+
+
+response_cache = ResponseCache(backend=create_backend(), ttl=setting.cache.response_ttl)
@@ -1,7 +1,7 @@
 import logging
 from pathlib import Path
 
-from pydantic import BaseModel
+from pydantic import BaseModel, IPvAnyNetwork
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 BASE_DIR = Path(__file__).parent.parent.parent
@@ -42,11 +42,64 @@ class DbSetting(BaseSettings):
 class AuthJWT(BaseModel):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
+    verified_cache_entries: int = 4096  # проверенных токенов в LRU decode_jwt
+
+
+class CacheSetting(BaseModel):
+    suggest_check_interval: float = 5.0
+    response_backend: str = "local"  # local или redis
+    response_ttl: float = 30.0
+    response_max_entries: int = 1024
+    redis_url: str = "redis://localhost:6379/0"
+    user_ttl: float = 30.0
+    user_max_entries: int = 10000
+    revocation_check_interval: float = 5.0
+    revocation_capacity: int = 100000  # ожидаемое число отозванных токенов
+    revocation_error_rate: float = 0.01  # доля ложных срабатываний фильтра Блума
+
+
+class BooksImportSetting(BaseModel):
+    chunk_size: int = 5000
+    max_errors: int = 1000
+
+
+class BooksExportSetting(BaseModel):
+    chunk_size: int = 1000
+
+
+class OverdueSetting(BaseModel):
+    enabled: bool = False  # фоновая проверка в lifespan приложения
+    interval: float = 86400.0  # секунд между проходами
+    batch_size: int = 500
+
+
+class PasswordHashSetting(BaseModel):
+    executor: str = "thread"  # thread или process
+    workers: int = 4  # одновременных вызовов bcrypt
+    max_queue: int = 64  # ожидающих вызовов сверх workers, дальше - отказ
+
+
+class LoginThrottleSetting(BaseModel):
+    username_rate: float = 0.1  # попыток в секунду на имя пользователя
+    username_burst: int = 5
+    ip_rate: float = 1.0  # попыток в секунду на адрес клиента
+    ip_burst: int = 20
+    max_entries: int = 100000  # корзин на каждый вид ключа
+    evict_interval: float = 60.0
+    # Адреса и сети прокси (nginx), которым доверяется X-Forwarded-For;
+    # пустой список - заголовок не читается
+    trusted_proxies: list[IPvAnyNetwork] = []
 
 
 class Setting(BaseSettings):
     db: DbSetting = DbSetting()
     auth_jwt: AuthJWT = AuthJWT()
+    cache: CacheSetting = CacheSetting()
+    books_import: BooksImportSetting = BooksImportSetting()
+    books_export: BooksExportSetting = BooksExportSetting()
+    overdue: OverdueSetting = OverdueSetting()
+    password_hash: PasswordHashSetting = PasswordHashSetting()
+    login_throttle: LoginThrottleSetting = LoginThrottleSetting()
 
 
 setting = Setting()
@@ -21,3 +21,7 @@ async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
+
+
+def get_async_session_maker() -> async_sessionmaker[AsyncSession]:
+    return async_session_maker
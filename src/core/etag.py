@@ -0,0 +1,50 @@
+import hashlib
+from typing import Callable, Coroutine
+
+from fastapi import Depends, Request, Response, status
+from fastapi.exceptions import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.database import get_async_session
+from src.core.versions import get_versions
+
+
+def make_etag(request: Request, versions: dict[str, int]) -> str:
+    source: str = "|".join(
+        [request.url.path, request.url.query]
+        + [f"{name}:{version}" for name, version in sorted(versions.items())]
+    )
+    return f'W/"{hashlib.sha1(source.encode()).hexdigest()}"'
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    # Слабое сравнение: префикс W/ не учитывается
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def etag_for(*tables: str) -> Callable[..., Coroutine]:
+    """
+    Зависимость для GET-запросов каталога: слабый ETag строится из версий
+    таблиц tables, при совпадении с If-None-Match сразу отдается 304
+    :param tables: str
+        имена таблиц, от которых зависит ответ
+    :return:
+        зависимость FastAPI
+    """
+
+    async def check_etag(
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(get_async_session),
+    ) -> None:
+        versions: dict[str, int] = await get_versions(session=session, names=tables)
+        etag: str = make_etag(request=request, versions=versions)
+        if_none_match: str = request.headers.get("if-none-match", "")
+        if if_none_match and etag_matches(etag=etag, if_none_match=if_none_match):
+            raise HTTPException(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+        response.headers["ETag"] = etag
+
+    return check_etag
@@ -20,3 +20,7 @@ class EmailInUse(Exception):
 
 class UniqueViolationError(Exception):
     pass
+
+
+class HashPoolBusy(Exception):
+    pass
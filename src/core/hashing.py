@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from src.core.config import configure_logging, setting
+from src.core.exceptions import HashPoolBusy
+from src.core.jwt_utils import create_hash_password, validate_password
+
+configure_logging(logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class OutHashMetricsSchemas(BaseModel):
+    calls_total: int = 0
+    rejected_total: int = 0
+    in_flight: int = 0  # вызовов в пуле, включая ожидающие
+    queue_depth: int = 0  # ожидающих свободного воркера
+    max_queue_depth: int = 0
+    last_duration: Optional[float] = None  # секунд от вызова до результата
+    max_duration: float = 0.0
+
+
+class PasswordHasher:
+    """
+    bcrypt в отдельном пуле потоков или процессов: хеширование
+    и проверка пароля не блокируют цикл событий. Одновременно работают
+    не больше workers вызовов, в очереди ждут не больше max_queue,
+    остальные сразу получают HashPoolBusy
+    """
+
+    def __init__(self, executor: str, workers: int, max_queue: int):
+        self.executor = executor
+        self.workers = workers
+        self.max_queue = max_queue
+        self.metrics = OutHashMetricsSchemas()
+        self._pool: Optional[Executor] = None
+
+    async def hash(self, password: str) -> bytes:
+        return await self._run(create_hash_password, password)
+
+    async def verify(self, password: str, hashed_password: bytes) -> bool:
+        return await self._run(validate_password, password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        if self.metrics.in_flight >= self.workers + self.max_queue:
+            self.metrics.rejected_total += 1
+            logger.warning(
+                "Password hash pool is busy: %d calls" % self.metrics.in_flight
+            )
+            raise HashPoolBusy("Password hash pool is busy")
+
+        self.metrics.calls_total += 1
+        self.metrics.in_flight += 1
+        self._update_queue_depth()
+        started: float = time.monotonic()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_pool(), func, *args
+            )
+        finally:
+            self.metrics.in_flight -= 1
+            self._update_queue_depth()
+            self.metrics.last_duration = time.monotonic() - started
+            self.metrics.max_duration = max(
+                self.metrics.max_duration, self.metrics.last_duration
+            )
+
+    def _update_queue_depth(self) -> None:
+        self.metrics.queue_depth = max(self.metrics.in_flight - self.workers, 0)
+        self.metrics.max_queue_depth = max(
+            self.metrics.max_queue_depth, self.metrics.queue_depth
+        )
+
+    def _get_pool(self) -> Executor:
+        # Пул создается при первом вызове, а не при импорте модуля
+        if self._pool is None:
+            if self.executor == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="bcrypt"
+                )
+        return self._pool
+
+
+password_hasher = PasswordHasher(
+    executor=setting.password_hash.executor,
+    workers=setting.password_hash.workers,
+    max_queue=setting.password_hash.max_queue,
+)
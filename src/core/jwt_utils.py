@@ -1,4 +1,9 @@
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import uuid4
 
 import bcrypt
 import jwt
@@ -59,13 +64,60 @@ def encode_jwt(
     return encoded
 
 
+class VerifiedTokenCache:
+    """
+    LRU уже проверенных токенов: дайджест токена -> (exp, payload).
+    Подпись одного и того же cookie проверяется один раз, дальше payload
+    отдается из памяти до exp токена
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def digest(token: str | bytes, key: str, algorithm: str) -> bytes:
+        # Ключ и алгоритм входят в дайджест: токен, проверенный
+        # другим ключом, не найдется в кеше
+        if isinstance(token, str):
+            token = token.encode()
+        return hashlib.sha256(f"{algorithm}:{key}:".encode() + token).digest()
+
+    def get(self, digest: bytes) -> Optional[dict]:
+        entry = self._entries.get(digest)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self._entries[digest]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return dict(entry[1])
+
+    def set(self, digest: bytes, payload: dict) -> None:
+        if "exp" not in payload:
+            return
+        self._entries[digest] = (float(payload["exp"]), dict(payload))
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+verified_tokens = VerifiedTokenCache(
+    max_entries=setting.auth_jwt.verified_cache_entries
+)
+
+
 def decode_jwt(
     token: str | bytes,
     key: str = setting_conn.SECRET_KEY,
     algorithm: str = setting.auth_jwt.algorithm,
 ):
     """
-        Раскодирует jwt-токен
+        Раскодирует jwt-токен. Токен, уже проверенный до истечения exp,
+        берется из verified_tokens без повторной проверки подписи
     :param token: str | bytes
         jwt-токен
     :param key: str
@@ -75,13 +127,38 @@ def decode_jwt(
     :return:
         ?? содержание токена (payload)
     """
+    digest: bytes = verified_tokens.digest(token, key, algorithm)
+    cached: Optional[dict] = verified_tokens.get(digest)
+    if cached is not None:
+        return cached
     decoded = jwt.decode(token, key, algorithms=[algorithm])
+    verified_tokens.set(digest, decoded)
     return decoded
 
 
-def create_jwt(user: str) -> str:
+def create_jwt(
+    user: str, is_superuser: Optional[bool] = None, version: Optional[int] = None
+) -> str:
+    """
+    Создает jwt-токен пользователя
+    :param user: str
+        id пользователя
+    :param is_superuser: Optional[bool]
+        claim "adm": по нему current_superuser_user проверяет права без запроса к БД
+    :param version: Optional[int]
+        claim "ver": версия пользователя на момент выдачи токена
+    :return: str
+    """
     payload = dict()
     payload["sub"] = user
+    payload["jti"] = uuid4().hex
+    # iat с долями секунды: токен, выданный в ту же секунду после отзыва
+    # всех токенов пользователя, новее revoked_at
+    payload["iat"] = datetime.now(timezone.utc).timestamp()
+    if is_superuser is not None:
+        payload["adm"] = is_superuser
+    if version is not None:
+        payload["ver"] = version
     expire = datetime.now(timezone.utc) + timedelta(
         minutes=setting.auth_jwt.access_token_expire_minutes
     )
@@ -0,0 +1,71 @@
+import logging
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import configure_logging
+from src.core.models import TableVersion
+
+configure_logging(logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def bump_version(session: AsyncSession, name: str) -> int:
+    """
+    Увеличивает версию таблицы в текущей транзакции (фиксируется вместе с изменением)
+    :param session: AsyncSession
+        сессия базы данных
+    :param name: str
+        имя таблицы
+    :return: int
+        новая версия таблицы
+    """
+    logger.info("Bump version of table %s" % name)
+    stmt = (
+        insert(TableVersion)
+        .values(name=name, version=1)
+        .on_conflict_do_update(
+            index_elements=[TableVersion.name],
+            set_={"version": TableVersion.version + 1},
+        )
+        .returning(TableVersion.version)
+    )
+    result: Result = await session.execute(stmt)
+    return result.scalar_one()
+
+
+async def get_versions(session: AsyncSession, names: Iterable[str]) -> dict[str, int]:
+    """
+    Текущие версии нескольких таблиц одним запросом
+    :param session: AsyncSession
+        сессия базы данных
+    :param names: Iterable[str]
+        имена таблиц
+    :return: dict[str, int]
+        версии таблиц, 0 - если таблица еще не изменялась
+    """
+    names = list(names)
+    stmt = select(TableVersion.name, TableVersion.version).filter(
+        TableVersion.name.in_(names)
+    )
+    result: Result = await session.execute(stmt)
+    versions: dict[str, int] = dict(result.all())
+    return {name: versions.get(name, 0) for name in names}
+
+
+async def get_version(session: AsyncSession, name: str) -> int:
+    """
+    Текущая версия таблицы
+    :param session: AsyncSession
+        сессия базы данных
+    :param name: str
+        имя таблицы
+    :return: int
+        версия таблицы, 0 - если таблица еще не изменялась
+    """
+    stmt = select(TableVersion.version).filter(TableVersion.name == name)
+    result: Result = await session.execute(stmt)
+    return result.scalar_one_or_none() or 0
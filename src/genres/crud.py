@@ -12,7 +12,9 @@ from src.genres.schemas import (
     GenreUpdateSchemas,
 )
 from src.core.exceptions import ErrorInData, ExceptDB
+from src.core.cache import cache_tag, response_cache
 from src.core.config import configure_logging
+from src.core.versions import bump_version
 
 configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,7 +32,9 @@ async def create_genre(session: AsyncSession, genre_in: GenreCreateSchemas) -> G
         raise ExceptDB(exc)
     else:
         session.add(genre)
+        await bump_version(session=session, name=Genre.__tablename__)
         await session.commit()
+        await response_cache.invalidate(cache_tag("genre"))
         return genre
 
 
@@ -63,11 +67,13 @@ async def update_genre_db(
             value,
         ) in genre_update.model_dump().items():  # Преобразовываем объект в словарь
             setattr(genre, name, value)
+        await bump_version(session=session, name=Genre.__tablename__)
         await session.commit()
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
         await session.rollback()
         raise ExceptDB(exc)
+    await response_cache.invalidate(cache_tag("genre"))
     return genre
 
 
@@ -75,8 +81,10 @@ async def delete_genre_db(session: AsyncSession, genre: Genre) -> None:
     logger.info("Delete genre by id %d" % genre.id)
     try:
         await session.delete(genre)
+        await bump_version(session=session, name=Genre.__tablename__)
         await session.commit()
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
         await session.rollback()
         raise ExceptDB(exc)
+    await response_cache.invalidate(cache_tag("genre"))
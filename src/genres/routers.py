@@ -5,6 +5,7 @@ from fastapi.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.database import get_async_session
+from src.core.etag import etag_for
 from src.core.exceptions import (
     ErrorInData,
     ExceptDB,
@@ -62,6 +63,7 @@ async def new_author(
 async def get_list_genre(
     session: AsyncSession = Depends(get_async_session),
     user: "User" = Depends(current_superuser_user),
+    etag: None = Depends(etag_for(Genre.__tablename__)),
 ):
     return await get_genres(session=session)
 
@@ -69,6 +71,7 @@ async def get_list_genre(
 @router.get("/{genre_id}/", response_model=OutGenreSchemas)
 async def get_genre(
     user: "User" = Depends(current_superuser_user),
+    etag: None = Depends(etag_for(Genre.__tablename__)),
     genre: Genre = Depends(genre_by_id),
 ):
     return genre
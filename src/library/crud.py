@@ -1,80 +1,163 @@
 import logging
-from typing import Optional, Union
-from datetime import datetime, timedelta, timezone
+from typing import Optional
+from datetime import datetime, timedelta
 
-from sqlalchemy import select, and_
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import (
+    ARRAY,
+    Integer,
+    and_,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    true,
+    update,
+)
 from sqlalchemy.engine import Result
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.authors.crud import get_author
-from src.books.models import Book
+from src.books.models import Book, BookRead
 from src.users.models import User
-from src.library.models import ReceivingBook
-from src.authors.models import Author
+from src.library.models import CirculationStat, Hold, ReceivingBook
 from src.genres.models import Genre
 from src.library.schemas import (
     ReceivingCreateSchemas,
     ReceivingReturnSchemas,
+    OutReceivingSchemas,
+    ReceivingBatchSchemas,
+    OutBatchItemSchemas,
+    OutBatchSchemas,
+    HoldCreateSchemas,
+    OutHoldSchemas,
+    OutBookOnHandsSchemas,
+    OutStatsItemSchemas,
+    OutStatsSchemas,
 )
 from src.core.exceptions import ErrorInData, ExceptDB
+from src.core.cache import cache_tag, response_cache
 from src.core.config import configure_logging
-from src.books.crud import book_to_schema
-from src.books.schemas import OutBookFoolSchemas
-from src.users.crud import get_user_by_id
+from src.books.crud import book_to_schema, bump_count_versions
 
 
 configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
+BOOKS_LIMIT = 5  # книг на руках у одного пользователя
 
-async def create_receiving(
-    session: AsyncSession, receiving_in: ReceivingCreateSchemas, user_in: User
-) -> ReceivingBook:
-    # ReceivingBook
-    logger.info("Start create receiving book")
-    book: Optional[Book] = await session.get(Book, receiving_in.model_dump()["book_id"])
 
-    if book is None:
-        logger.info("Not find book")
-        raise ErrorInData("Not find book")
+async def lock_user(session: AsyncSession, user_id: int) -> None:
+    # Проверка BOOKS_LIMIT видит снимок транзакции: без блокировки две
+    # параллельные выдачи одному читателю проходят обе. FOR NO KEY UPDATE
+    # не мешает вставкам receiving_books, ссылающимся на users
+    await session.execute(
+        select(User.id).where(User.id == user_id).with_for_update(key_share=True)
+    )
 
-    stmt = select(ReceivingBook).filter(ReceivingBook.user_id == user_in.id)
-    result: Result = await session.execute(stmt)
-    books_user = result.scalars().all()
-    if len(books_user) >= 5:
-        logger.info("The user has 5 books")
-        raise ErrorInData("The user has 5 books")
 
-    if book.count == 0:
-        logger.info("These books are not available")
-        raise ErrorInData("These books are not available")
+async def create_receiving(
+    session: AsyncSession, receiving_in: ReceivingCreateSchemas, user_in: User
+) -> OutReceivingSchemas:
+    """
+    Выдача книги одним запросом: CTE уменьшает count книги при условии,
+    что экземпляр есть, у пользователя меньше BOOKS_LIMIT книг и этой
+    книги у него нет, и в том же запросе добавляет запись о выдаче.
+    Выдачи одному пользователю идут по очереди под блокировкой его строки.
+    Причина отказа выясняется дополнительным запросом только при неудаче
+    """
+    logger.info("Start create receiving book")
+    book_id: int = receiving_in.model_dump()["book_id"]
+    user_id: int = user_in.id
+    date_of_return = datetime.now() + timedelta(days=14)
 
-    stmt = (
-        select(User)
-        .filter(User.id == user_in.id)
-        .options(selectinload(User.books).joinedload(ReceivingBook.book))
+    user_loans = ReceivingBook.user_id == user_id
+    on_loan = exists().where(user_loans, ReceivingBook.book_id == book_id)
+    taken = (
+        update(Book)
+        .where(
+            Book.id == book_id,
+            Book.count > 0,
+            select(func.count()).where(user_loans).scalar_subquery() < BOOKS_LIMIT,
+            ~on_loan,
+        )
+        .values(count=Book.count - 1)
+        .returning(Book.id, Book.id_author)
+        .cte("taken")
     )
-    result: Result = await session.execute(stmt)
-    current_user = result.scalars().first()
-
-    date_of_return = datetime.now() + timedelta(days=14)
-    receiving_book = ReceivingBook(
-        date_of_return=date_of_return,
+    loan = (
+        insert(ReceivingBook)
+        .from_select(
+            ["user_id", "book_id", "date_of_return"],
+            select(literal(user_id), taken.c.id, literal(date_of_return)),
+            # date_of_issue заполняет server_default
+            include_defaults=False,
+        )
+        .returning(
+            ReceivingBook.user_id,
+            ReceivingBook.book_id,
+            ReceivingBook.date_of_issue,
+            ReceivingBook.date_of_return,
+        )
+        .cte("loan")
     )
+    stmt = select(loan, taken.c.id_author).join(taken, taken.c.id == loan.c.book_id)
 
     try:
-        receiving_book.book = book
-        current_user.books.append(receiving_book)
-        book.count -= 1
+        await lock_user(session=session, user_id=user_id)
+        result: Result = await session.execute(stmt)
+        row = result.one_or_none()
+        if row is None:
+            # Запрос ничего не изменил, откатывать нечего
+            raise ErrorInData(
+                await receiving_error(session=session, book_id=book_id, user_id=user_id)
+            )
+        await bump_count_versions(session=session, books_ids=[book_id])
         await session.commit()
-    except IntegrityError as exc:
+    except IntegrityError:
+        # Параллельная выдача той же книги тому же пользователю
         logger.warning("The user already has this book")
         await session.rollback()
         raise ExceptDB("The user already has this book")
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        await session.rollback()
+        raise ExceptDB(exc)
+    await response_cache.invalidate(
+        cache_tag("book", book_id), cache_tag("author", row.id_author)
+    )
 
-    return receiving_book
+    return OutReceivingSchemas(
+        book_id=row.book_id,
+        user_id=row.user_id,
+        date_of_issue=row.date_of_issue,
+        date_of_return=row.date_of_return,
+    )
+
+
+async def receiving_error(session: AsyncSession, book_id: int, user_id: int) -> str:
+    # Порядок проверок совпадает с прежней пошаговой выдачей
+    user_loans = ReceivingBook.user_id == user_id
+    stmt = select(
+        select(Book.count).where(Book.id == book_id).scalar_subquery().label("count"),
+        select(func.count()).where(user_loans).scalar_subquery().label("total"),
+        exists().where(user_loans, ReceivingBook.book_id == book_id).label("on_loan"),
+    )
+    result: Result = await session.execute(stmt)
+    state = result.one()
+    if state.count is None:
+        message = "Not find book"
+    elif state.total >= BOOKS_LIMIT:
+        message = f"The user has {BOOKS_LIMIT} books"
+    elif state.count == 0:
+        message = "These books are not available"
+    elif state.on_loan:
+        message = "The user already has this book"
+    else:
+        message = "The book was taken by another reader, try again"
+    logger.info(message)
+    return message
 
 
 async def return_receiving(
@@ -91,51 +174,470 @@ async def return_receiving(
         logger.info("The user does not have this book")
         raise ErrorInData("The user does not have this book")
 
-    book: Optional[Book] = await session.get(Book, book_id)
-    if book is None:
+    result = await session.execute(select(Book.id_author).filter(Book.id == book_id))
+    id_author: Optional[int] = result.scalar_one_or_none()
+    if id_author is None:
         logger.info("Not find book")
         raise ErrorInData("Not find book")
 
     try:
         await session.delete(books_user)
-        book.count += 1
+        # Экземпляр уходит первому в очереди или возвращается на полку.
+        # count увеличивается в БД: параллельная выдача не теряет уменьшение
+        if not await allocate_holds(session=session, books_ids=[book_id]):
+            await session.execute(
+                update(Book).where(Book.id == book_id).values(count=Book.count + 1)
+            )
+            await bump_count_versions(session=session, books_ids=[book_id])
         await session.commit()
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
         await session.rollback()
         raise ExceptDB(exc)
+    await response_cache.invalidate(
+        cache_tag("book", book_id), cache_tag("author", id_author)
+    )
     return "The book has been returned to the library"
 
 
-async def get_books(session: AsyncSession, user_id: int) -> list[OutBookFoolSchemas]:
-    logger.info("Getting a list of books user %s" % user_id)
+async def create_receiving_batch(
+    session: AsyncSession, batch_in: ReceivingBatchSchemas, user_in: User
+) -> OutBatchSchemas:
+    """
+    Выдача нескольких книг одному пользователю в одной транзакции.
+    Строки книг блокируются одним запросом, решение по каждой книге
+    принимается в порядке запроса с теми же проверками, что и при
+    одиночной выдаче, а лимит BOOKS_LIMIT считается на весь пакет
+    под блокировкой строки пользователя.
+    Остатки уменьшаются и записи о выдаче добавляются одним запросом
+    """
+    logger.info("Start create receiving batch")
+    books_ids: list[int] = batch_in.model_dump()["books_ids"]
+    user_id: int = user_in.id
+    date_of_return = datetime.now() + timedelta(days=14)
+
+    user_loans = ReceivingBook.user_id == user_id
+    stmt = (
+        select(
+            Book.id,
+            Book.count,
+            Book.id_author,
+            exists()
+            .where(user_loans, ReceivingBook.book_id == Book.id)
+            .label("on_loan"),
+            select(func.count()).where(user_loans).scalar_subquery().label("total"),
+        )
+        .filter(Book.id.in_(books_ids))
+        .order_by(Book.id)
+        .with_for_update(of=Book)
+    )
     try:
-        stmt = select(ReceivingBook).filter(ReceivingBook.user_id == user_id)
+        await lock_user(session=session, user_id=user_id)
         result: Result = await session.execute(stmt)
-        list_books = result.scalars().all()
+        books = {row.id: row for row in result.all()}
+
+        items: list[OutBatchItemSchemas] = list()
+        granted: list[int] = list()
+        total: int = next(iter(books.values())).total if books else 0
+        for book_id in books_ids:
+            book = books.get(book_id)
+            success: bool = False
+            if book is None:
+                detail = "Not find book"
+            elif total + len(granted) >= BOOKS_LIMIT:
+                detail = f"The user has {BOOKS_LIMIT} books"
+            elif book.count == 0:
+                detail = "These books are not available"
+            elif book.on_loan or book_id in granted:
+                detail = "The user already has this book"
+            else:
+                granted.append(book_id)
+                success, detail = True, "The book has been issued"
+            items.append(
+                OutBatchItemSchemas(book_id=book_id, success=success, detail=detail)
+            )
 
+        if granted:
+            taken = (
+                update(Book)
+                .where(Book.id.in_(granted), Book.count > 0)
+                .values(count=Book.count - 1)
+                .returning(Book.id)
+                .cte("taken")
+            )
+            loan = (
+                insert(ReceivingBook)
+                .add_cte(taken)
+                .from_select(
+                    ["user_id", "book_id", "date_of_return"],
+                    select(literal(user_id), taken.c.id, literal(date_of_return)),
+                    include_defaults=False,
+                )
+            )
+            await session.execute(loan)
+            await bump_count_versions(session=session, books_ids=granted)
+        await session.commit()
+    except IntegrityError:
+        logger.warning("The user already has this book")
+        await session.rollback()
+        raise ExceptDB("The user already has this book")
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
-        raise ExceptDB("Error in data base")
-    else:
-        list_id_books = list()
-        for book in list_books:
-            list_id_books.append(book.book_id)
-
-        stmt = (
-            select(Book)
-            .filter(Book.id.in_(list_id_books))
-            .options(joinedload(Book.author))
-            .order_by(Book.id)
+        await session.rollback()
+        raise ExceptDB(exc)
+    if granted:
+        await response_cache.invalidate(
+            *[cache_tag("book", book_id) for book_id in granted],
+            *{cache_tag("author", books[book_id].id_author) for book_id in granted},
+        )
+    logger.info("Issued %d of %d books" % (len(granted), len(books_ids)))
+    return OutBatchSchemas(items=items)
+
+
+async def return_receiving_batch(
+    session: AsyncSession, batch_in: ReceivingBatchSchemas, user_in: User
+) -> OutBatchSchemas:
+    """
+    Возврат нескольких книг в одной транзакции: записи о выдаче удаляются
+    одним запросом, освободившиеся экземпляры уходят первым в очередях,
+    остатки остальных книг увеличиваются одним запросом
+    """
+    logger.info("Start return batch in library")
+    books_ids: list[int] = batch_in.model_dump()["books_ids"]
+    user_id: int = user_in.id
+
+    stmt = (
+        delete(ReceivingBook.__table__)
+        .where(ReceivingBook.user_id == user_id, ReceivingBook.book_id.in_(books_ids))
+        .returning(ReceivingBook.book_id)
+    )
+    try:
+        result: Result = await session.execute(stmt)
+        returned: list[int] = list(result.scalars().all())
+        allocated: dict[int, int] = dict()
+        if returned:
+            allocated = await allocate_holds(session=session, books_ids=returned)
+        shelved: list[int] = [
+            book_id for book_id in returned if book_id not in allocated
+        ]
+        authors: dict[int, int] = dict()
+        if shelved:
+            stmt = (
+                update(Book.__table__)
+                .where(Book.id.in_(shelved))
+                .values(count=Book.count + 1)
+                .returning(Book.id, Book.id_author)
+            )
+            result = await session.execute(stmt)
+            authors = {row.id: row.id_author for row in result.all()}
+            await bump_count_versions(session=session, books_ids=shelved)
+        await session.commit()
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        await session.rollback()
+        raise ExceptDB(exc)
+    if authors:
+        await response_cache.invalidate(
+            *[cache_tag("book", book_id) for book_id in authors],
+            *{cache_tag("author", id_author) for id_author in authors.values()},
+        )
+
+    items: list[OutBatchItemSchemas] = list()
+    done: set[int] = set()
+    for book_id in books_ids:
+        success: bool = book_id in returned and book_id not in done
+        done.add(book_id)
+        items.append(
+            OutBatchItemSchemas(
+                book_id=book_id,
+                success=success,
+                detail=(
+                    "The book has been returned to the library"
+                    if success
+                    else "The user does not have this book"
+                ),
+            )
+        )
+    logger.info("Returned %d of %d books" % (len(returned), len(books_ids)))
+    return OutBatchSchemas(items=items)
+
+
+async def allocate_holds(session: AsyncSession, books_ids: list[int]) -> dict[int, int]:
+    """
+    Выдает освободившиеся экземпляры первым в очередях ожидания.
+    Очередь каждой книги читается с FOR UPDATE SKIP LOCKED: параллельные
+    возвраты не ждут друг друга и не выдают один экземпляр дважды.
+    Пропускаются читатели, у которых уже BOOKS_LIMIT книг или эта книга.
+    Один читатель может стоять первым в нескольких очередях: его строка
+    блокируется, как при выдаче, и ему достается не больше книг, чем
+    осталось до лимита. Книги сверх лимита переходят к следующим в очереди
+    :param session: AsyncSession
+        сессия БД, изменения фиксирует вызывающий код
+    :param books_ids: list[int]
+        id возвращенных книг, по одному экземпляру на id
+    :return: dict[int, int]
+        id книги -> id читателя, которому выдан экземпляр
+    """
+    allocated: dict[int, int] = dict()
+    full: set[int] = set()
+    pending: list[int] = books_ids
+    while pending:
+        holds = await next_holds(session=session, books_ids=pending, skip_users=full)
+        if not holds:
+            break
+
+        users: list[int] = sorted({hold.user_id for hold in holds})
+        await session.execute(
+            select(User.id)
+            .where(User.id.in_(users))
+            .order_by(User.id)
+            .with_for_update(key_share=True)
+        )
+        result: Result = await session.execute(
+            select(ReceivingBook.user_id, func.count())
+            .where(ReceivingBook.user_id.in_(users))
+            .group_by(ReceivingBook.user_id)
         )
+        room: dict[int, int] = {user_id: BOOKS_LIMIT for user_id in users}
+        for user_id, total in result.all():
+            room[user_id] -= total
+
+        granted: list = list()
+        pending = list()
+        for hold in sorted(holds, key=lambda hold: (hold.created_at, hold.id)):
+            if room[hold.user_id] > 0:
+                room[hold.user_id] -= 1
+                granted.append(hold)
+            else:
+                full.add(hold.user_id)
+                pending.append(hold.book_id)
+        if granted:
+            await grant_holds(session=session, holds_ids=[hold.id for hold in granted])
+            allocated.update({hold.book_id: hold.user_id for hold in granted})
+
+    if allocated:
+        logger.info("Allocated %d books to holds" % len(allocated))
+    return allocated
+
+
+async def next_holds(
+    session: AsyncSession, books_ids: list[int], skip_users: set[int]
+) -> list:
+    # Первый подходящий читатель в очереди каждой книги
+    returned = (
+        func.unnest(literal(books_ids, ARRAY(Integer)))
+        .table_valued("book_id")
+        .render_derived("returned")
+    )
+    next_hold = (
+        select(Hold.id, Hold.user_id, Hold.book_id, Hold.created_at)
+        .where(
+            Hold.book_id == returned.c.book_id,
+            Hold.user_id.not_in(sorted(skip_users)),
+            select(func.count())
+            .where(ReceivingBook.user_id == Hold.user_id)
+            .scalar_subquery()
+            < BOOKS_LIMIT,
+            ~exists().where(
+                ReceivingBook.user_id == Hold.user_id,
+                ReceivingBook.book_id == Hold.book_id,
+            ),
+        )
+        .order_by(Hold.created_at, Hold.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .lateral("next_hold")
+    )
+    stmt = select(next_hold).select_from(returned).join(next_hold, true())
+    result: Result = await session.execute(stmt)
+    return list(result.all())
+
+
+async def grant_holds(session: AsyncSession, holds_ids: list[int]) -> None:
+    # Записи очереди заменяются записями о выдаче одним запросом
+    taken = (
+        delete(Hold.__table__)
+        .where(Hold.id.in_(holds_ids))
+        .returning(Hold.user_id, Hold.book_id)
+        .cte("taken")
+    )
+    loan = (
+        insert(ReceivingBook)
+        .add_cte(taken)
+        .from_select(
+            ["user_id", "book_id", "date_of_return"],
+            select(
+                taken.c.user_id,
+                taken.c.book_id,
+                literal(datetime.now() + timedelta(days=14)),
+            ),
+            include_defaults=False,
+        )
+    )
+    await session.execute(loan)
+
+
+async def create_hold(
+    session: AsyncSession, hold_in: HoldCreateSchemas, user_in: User
+) -> OutHoldSchemas:
+    logger.info("Start create hold")
+    book_id: int = hold_in.model_dump()["book_id"]
+    user_id: int = user_in.id
+
+    stmt = select(
+        select(Book.count).where(Book.id == book_id).scalar_subquery().label("count"),
+        exists()
+        .where(ReceivingBook.user_id == user_id, ReceivingBook.book_id == book_id)
+        .label("on_loan"),
+    )
+    try:
         result: Result = await session.execute(stmt)
-        books = result.scalars().all()
+        state = result.one()
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        raise ExceptDB(exc)
+    if state.count is None:
+        logger.info("Not find book")
+        raise ErrorInData("Not find book")
+    if state.count > 0:
+        logger.info("The book is available")
+        raise ErrorInData("The book is available")
+    if state.on_loan:
+        logger.info("The user already has this book")
+        raise ErrorInData("The user already has this book")
 
-        list_books = list()
-        for book in books:  # type: Book
-            list_books.append(await book_to_schema(session=session, book=book))
+    hold = (
+        insert(Hold)
+        .values(user_id=user_id, book_id=book_id)
+        .returning(Hold.user_id, Hold.book_id, Hold.created_at)
+        .cte("hold")
+    )
+    # Подзапрос видит очередь без новой записи
+    position = select(func.count()).where(Hold.book_id == book_id).scalar_subquery()
+    stmt = select(hold, (position + 1).label("position"))
+    try:
+        result = await session.execute(stmt)
+        row = result.one()
+        await session.commit()
+    except IntegrityError:
+        logger.warning("The user already has a hold on this book")
+        await session.rollback()
+        raise ExceptDB("The user already has a hold on this book")
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        await session.rollback()
+        raise ExceptDB(exc)
+    return OutHoldSchemas(
+        book_id=row.book_id,
+        user_id=row.user_id,
+        created_at=row.created_at,
+        position=row.position,
+    )
+
+
+async def cancel_hold(session: AsyncSession, book_id: int, user_in: User) -> None:
+    logger.info("Cancel hold on book %d" % book_id)
+    stmt = (
+        delete(Hold.__table__)
+        .where(Hold.user_id == user_in.id, Hold.book_id == book_id)
+        .returning(Hold.id)
+    )
+    try:
+        result: Result = await session.execute(stmt)
+        canceled = result.scalar_one_or_none()
+        await session.commit()
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        await session.rollback()
+        raise ExceptDB(exc)
+    if canceled is None:
+        logger.info("The user does not have a hold on this book")
+        raise ErrorInData("The user does not have a hold on this book")
+
+
+async def get_books(session: AsyncSession, user_id: int) -> list[OutBookOnHandsSchemas]:
+    logger.info("Getting a list of books user %s" % user_id)
+    # Книги на руках одним запросом: модель чтения и даты выдачи
+    stmt = (
+        select(BookRead, ReceivingBook.date_of_issue, ReceivingBook.date_of_return)
+        .join(ReceivingBook, ReceivingBook.book_id == BookRead.id)
+        .filter(ReceivingBook.user_id == user_id)
+        .order_by(BookRead.id)
+    )
+    try:
+        result: Result = await session.execute(stmt)
+        rows = result.all()
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        raise ExceptDB("Error in data base")
+
+    return [
+        OutBookOnHandsSchemas(
+            **book_to_schema(book=book).model_dump(),
+            date_of_issue=date_of_issue,
+            date_of_return=date_of_return,
+        )
+        for book, date_of_issue, date_of_return in rows
+    ]
 
-        return list_books
+
+async def get_stats(session: AsyncSession, limit: int) -> OutStatsSchemas:
+    """
+    Статистика выдач из счетчиков circulation_stats: запросы читают
+    не больше limit строк счетчиков по индексу и не агрегируют receiving_books
+    :param session: AsyncSession
+        сессия БД
+    :param limit: int
+        размер списков самых читаемых книг, жанров и самых активных читателей
+    :return: OutStatsSchemas
+    """
+    logger.info("Getting circulation stats")
+    totals_stmt = select(
+        func.coalesce(func.sum(CirculationStat.active), 0),
+        func.coalesce(func.sum(CirculationStat.total), 0),
+    ).filter(CirculationStat.kind == "all")
+    tops = (
+        ("book", BookRead.id, BookRead.title),
+        ("genre", Genre.id, Genre.title),
+        ("user", User.id, User.username),
+    )
+    try:
+        result: Result = await session.execute(totals_stmt)
+        active_loans, total_loans = result.one()
+        items: list[list[OutStatsItemSchemas]] = list()
+        for kind, object_id, name in tops:
+            stmt = (
+                select(object_id, name, CirculationStat.active, CirculationStat.total)
+                .join(CirculationStat, CirculationStat.object_id == object_id)
+                .filter(CirculationStat.kind == kind, CirculationStat.total > 0)
+                .order_by(
+                    CirculationStat.active.desc(),
+                    CirculationStat.total.desc(),
+                    object_id,
+                )
+                .limit(limit)
+            )
+            result = await session.execute(stmt)
+            items.append(
+                [
+                    OutStatsItemSchemas(
+                        id=row[0], name=row[1], active=row[2], total=row[3]
+                    )
+                    for row in result.all()
+                ]
+            )
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        raise ExceptDB("Error in data base")
+
+    books, genres, readers = items
+    return OutStatsSchemas(
+        active_loans=active_loans,
+        total_loans=total_loans,
+        books=books,
+        genres=genres,
+        readers=readers,
+    )
 
 
 # async def get_book(session: AsyncSession, book_id: int) -> Optional[Book]:
@@ -1,7 +1,17 @@
 from typing import TYPE_CHECKING
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, func, UniqueConstraint
+from sqlalchemy import (
+    DDL,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    event,
+    func,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.database import Base
@@ -15,6 +25,7 @@ class ReceivingBook(Base):
     __tablename__ = "receiving_books"
     __table_args__ = (
         UniqueConstraint("user_id", "book_id", name="idx_unique_user_book"),
+        Index("ix_receiving_books_date_of_return_id", "date_of_return", "id"),
     )
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -31,3 +42,140 @@ class ReceivingBook(Base):
 
     def __repr__(self) -> str:
         return f"{self.book_id}, {self.user_id}, {self.date_of_issue}, {self.date_of_return}"
+
+
+class Hold(Base):
+    """
+    Очередь ожидания книги: освободившийся экземпляр выдается
+    первому в очереди по created_at
+    """
+
+    __tablename__ = "holds"
+    __table_args__ = (
+        UniqueConstraint("user_id", "book_id", name="idx_unique_hold_user_book"),
+        Index("ix_holds_book_id_created_at", "book_id", "created_at"),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    book_id: Mapped[int] = mapped_column(ForeignKey("books.id", ondelete="CASCADE"))
+    created_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"{self.book_id}, {self.user_id}, {self.created_at}"
+
+
+class CirculationStat(Base):
+    """
+    Счетчики выдач для статистики: kind - "all", "book", "genre" или "user",
+    object_id - id книги, жанра или читателя. Общий счетчик "all" разбит
+    на 16 строк по id читателя, чтобы параллельные выдачи не ждали одну строку.
+    active - книг на руках сейчас, total - выдач за все время.
+    Счетчики ведут триггеры на receiving_books в той же транзакции, что и выдача
+    """
+
+    __tablename__ = "circulation_stats"
+    __table_args__ = (
+        Index("ix_circulation_stats_kind_active", "kind", "active", "total"),
+    )
+    kind: Mapped[str] = mapped_column(String(10), primary_key=True)
+    object_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    active: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    total: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+    def __repr__(self) -> str:
+        return f"{self.kind}, {self.object_id}, {self.active}, {self.total}"
+
+
+# Тексты функций и триггеров повторены в миграции, создавшей circulation_stats
+CIRCULATION_STATS_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION circulation_stats_add(
+        book integer, reader integer, delta integer, loans integer
+    ) RETURNS void AS $$
+        INSERT INTO circulation_stats AS s (kind, object_id, active, total)
+        SELECT k.kind, k.object_id, delta, loans
+        FROM (
+            VALUES ('all', mod(reader, 16)), ('book', book), ('user', reader)
+            UNION ALL
+            -- Повтор жанра в genres_ids дал бы две строки одного ключа в ON CONFLICT
+            SELECT DISTINCT 'genre', unnest(b.genres_ids)
+            FROM books AS b WHERE b.id = book
+        ) AS k(kind, object_id)
+        ORDER BY k.kind, k.object_id
+        ON CONFLICT (kind, object_id) DO UPDATE SET
+            active = s.active + EXCLUDED.active,
+            total = s.total + EXCLUDED.total
+    $$ LANGUAGE sql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION circulation_stats_loan() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM circulation_stats_add(NEW.book_id, NEW.user_id, 1, 1);
+        ELSE
+            PERFORM circulation_stats_add(OLD.book_id, OLD.user_id, -1, 0);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION circulation_stats_genres() RETURNS trigger AS $$
+    BEGIN
+        -- Выданные экземпляры переходят из старых жанров книги в новые
+        UPDATE circulation_stats AS s SET active = s.active - b.active
+        FROM circulation_stats AS b
+        WHERE b.kind = 'book' AND b.object_id = NEW.id
+            AND s.kind = 'genre' AND s.object_id = ANY(OLD.genres_ids);
+        INSERT INTO circulation_stats AS s (kind, object_id, active, total)
+        SELECT 'genre', g.id, b.active, 0
+        FROM circulation_stats AS b,
+            unnest(ARRAY(SELECT DISTINCT unnest(NEW.genres_ids))) AS g(id)
+        WHERE b.kind = 'book' AND b.object_id = NEW.id
+        ON CONFLICT (kind, object_id) DO UPDATE SET
+            active = s.active + EXCLUDED.active;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION circulation_stats_forget() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM circulation_stats
+        WHERE kind = TG_ARGV[0] AND object_id = OLD.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER circulation_stats_sync AFTER INSERT OR DELETE ON receiving_books
+    FOR EACH ROW EXECUTE FUNCTION circulation_stats_loan()
+    """,
+    """
+    CREATE TRIGGER circulation_stats_sync AFTER UPDATE OF genres_ids ON books
+    FOR EACH ROW WHEN (OLD.genres_ids IS DISTINCT FROM NEW.genres_ids)
+    EXECUTE FUNCTION circulation_stats_genres()
+    """,
+    """
+    CREATE TRIGGER circulation_stats_forget AFTER DELETE ON books
+    FOR EACH ROW EXECUTE FUNCTION circulation_stats_forget('book')
+    """,
+    """
+    CREATE TRIGGER circulation_stats_forget AFTER DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION circulation_stats_forget('user')
+    """,
+)
+
+CIRCULATION_STATS_DROP_DDL = (
+    "DROP FUNCTION IF EXISTS circulation_stats_loan() CASCADE",
+    "DROP FUNCTION IF EXISTS circulation_stats_genres() CASCADE",
+    "DROP FUNCTION IF EXISTS circulation_stats_forget() CASCADE",
+    "DROP FUNCTION IF EXISTS circulation_stats_add(integer, integer, integer, integer)",
+)
+
+for statement in CIRCULATION_STATS_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement))
+for statement in CIRCULATION_STATS_DROP_DDL:
+    event.listen(Base.metadata, "after_drop", DDL(statement))
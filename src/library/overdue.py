@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Sequence
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.engine import Result
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.config import configure_logging, setting
+from src.core.database import async_session_maker
+from src.library.models import ReceivingBook
+from src.library.schemas import OutOverdueMetricsSchemas, OverdueEventSchemas
+
+configure_logging(logging.INFO)
+logger = logging.getLogger(__name__)
+
+OverdueHandler = Callable[[Sequence[OverdueEventSchemas]], Awaitable[None]]
+
+
+async def log_overdue(events: Sequence[OverdueEventSchemas]) -> None:
+    for event in events:
+        logger.warning(
+            "Overdue loan %d: user %d, book %d, %d days"
+            % (event.loan_id, event.user_id, event.book_id, event.days_overdue)
+        )
+
+
+class OverdueScanner:
+    """
+    Поиск просроченных выдач пачками по batch_size строк.
+    Пачки читаются по ключу (date_of_return, id) через индекс
+    ix_receiving_books_date_of_return_id, поэтому таблица receiving_books
+    никогда не загружается целиком, а каждая пачка - отдельный запрос
+    """
+
+    def __init__(self, batch_size: int, handlers: Sequence[OverdueHandler]):
+        self.batch_size = batch_size
+        self.handlers = list(handlers)
+        self.metrics = OutOverdueMetricsSchemas()
+
+    async def scan(
+        self, session: AsyncSession, now: Optional[datetime] = None
+    ) -> OutOverdueMetricsSchemas:
+        """
+        Один проход по просроченным выдачам
+        :param session: AsyncSession
+            сессия БД
+        :param now: Optional[datetime]
+            момент, относительно которого выдача считается просроченной
+        :return: OutOverdueMetricsSchemas
+            метрики после прохода
+        """
+        now = now or datetime.now()
+        started: float = time.monotonic()
+        logger.info("Start overdue scan")
+        backlog: int = 0
+        last: Optional[tuple[datetime, int]] = None
+        try:
+            while True:
+                stmt = (
+                    select(
+                        ReceivingBook.id,
+                        ReceivingBook.user_id,
+                        ReceivingBook.book_id,
+                        ReceivingBook.date_of_return,
+                    )
+                    .filter(ReceivingBook.date_of_return < now)
+                    .order_by(ReceivingBook.date_of_return, ReceivingBook.id)
+                    .limit(self.batch_size)
+                )
+                if last is not None:
+                    stmt = stmt.filter(
+                        tuple_(ReceivingBook.date_of_return, ReceivingBook.id)
+                        > tuple_(*last)
+                    )
+                result: Result = await session.execute(stmt)
+                rows = result.all()
+                if not rows:
+                    break
+                events = [
+                    OverdueEventSchemas(
+                        loan_id=row.id,
+                        user_id=row.user_id,
+                        book_id=row.book_id,
+                        date_of_return=row.date_of_return,
+                        days_overdue=(now - row.date_of_return).days,
+                    )
+                    for row in rows
+                ]
+                for handler in self.handlers:
+                    await handler(events)
+                backlog += len(events)
+                last = (rows[-1].date_of_return, rows[-1].id)
+                if len(rows) < self.batch_size:
+                    break
+        except SQLAlchemyError as exc:
+            logger.exception("Error in data base %s", exc)
+            self.metrics.scans_failed += 1
+            raise
+
+        self.metrics.scans_total += 1
+        self.metrics.events_total += backlog
+        self.metrics.backlog = backlog
+        self.metrics.last_scan_at = now
+        self.metrics.last_scan_duration = time.monotonic() - started
+        logger.info(
+            "Overdue scan finished: %d loans in %.3f s"
+            % (backlog, self.metrics.last_scan_duration)
+        )
+        return self.metrics
+
+    async def run(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        # Фоновая задача lifespan: ошибка одного прохода не останавливает задачу,
+        # CancelledError при остановке приложения не перехватывается
+        while True:
+            try:
+                async with session_maker() as session:
+                    await self.scan(session=session)
+            except SQLAlchemyError:
+                pass  # уже записана и посчитана в scan
+            except Exception as exc:
+                logger.exception("Overdue scan failed %s", exc)
+                self.metrics.scans_failed += 1
+            await asyncio.sleep(setting.overdue.interval)
+
+
+overdue_scanner = OverdueScanner(
+    batch_size=setting.overdue.batch_size, handlers=[log_overdue]
+)
+
+
+async def main(batch_size: int) -> None:
+    overdue_scanner.batch_size = batch_size
+    async with async_session_maker() as session:
+        metrics = await overdue_scanner.scan(session=session)
+    print(metrics.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan overdue loans")
+    parser.add_argument("--batch-size", type=int, default=setting.overdue.batch_size)
+    args = parser.parse_args()
+    asyncio.run(main(batch_size=args.batch_size))
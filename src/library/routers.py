@@ -1,6 +1,6 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
 from fastapi.responses import Response
 from fastapi.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,21 +11,32 @@ from src.core.exceptions import (
     ExceptDB,
 )
 from src.library.crud import (
+    cancel_hold,
+    create_hold,
     create_receiving,
+    create_receiving_batch,
     return_receiving,
+    return_receiving_batch,
     get_books,
+    get_stats,
 )
+from src.library.overdue import overdue_scanner
 from src.users.depends import (
     current_superuser_user,
     current_user_authorization,
 )
-from src.books.schemas import OutBookFoolSchemas
 from src.users.models import User
-from src.library.models import ReceivingBook
 from src.library.schemas import (
     ReceivingCreateSchemas,
     OutReceivingSchemas,
     ReceivingReturnSchemas,
+    ReceivingBatchSchemas,
+    OutBatchSchemas,
+    HoldCreateSchemas,
+    OutHoldSchemas,
+    OutOverdueMetricsSchemas,
+    OutBookOnHandsSchemas,
+    OutStatsSchemas,
 )
 
 
@@ -43,7 +54,7 @@ async def receiving_book(
     user: User = Depends(current_user_authorization),
 ):
     try:
-        result: ReceivingBook = await create_receiving(
+        result: OutReceivingSchemas = await create_receiving(
             session=session, receiving_in=receiving, user_in=user
         )
     except ExceptDB as exp:
@@ -88,7 +99,121 @@ async def return_book(
         return result
 
 
-@router.get("/on-hands", response_model=list[OutBookFoolSchemas])
+@router.post(
+    "/receiving/batch",
+    response_model=OutBatchSchemas,
+    status_code=status.HTTP_200_OK,
+)
+async def receiving_books_batch(
+    batch: ReceivingBatchSchemas,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user_authorization),
+):
+    try:
+        result: OutBatchSchemas = await create_receiving_batch(
+            session=session, batch_in=batch, user_in=user
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    return result
+
+
+@router.post(
+    "/return/batch",
+    response_model=OutBatchSchemas,
+    status_code=status.HTTP_200_OK,
+)
+async def return_books_batch(
+    batch: ReceivingBatchSchemas,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user_authorization),
+):
+    try:
+        result: OutBatchSchemas = await return_receiving_batch(
+            session=session, batch_in=batch, user_in=user
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    return result
+
+
+@router.post(
+    "/holds",
+    response_model=OutHoldSchemas,
+    status_code=status.HTTP_201_CREATED,
+)
+async def place_hold(
+    hold: HoldCreateSchemas,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user_authorization),
+):
+    try:
+        result: OutHoldSchemas = await create_hold(
+            session=session, hold_in=hold, user_in=user
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    except ErrorInData as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    return result
+
+
+@router.delete("/holds/{book_id}/", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_hold(
+    book_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user_authorization),
+) -> None:
+    try:
+        await cancel_hold(session=session, book_id=book_id, user_in=user)
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    except ErrorInData as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+
+
+@router.get("/overdue/metrics", response_model=OutOverdueMetricsSchemas)
+async def get_overdue_metrics(
+    user: "User" = Depends(current_superuser_user),
+):
+    return overdue_scanner.metrics
+
+
+@router.get("/stats", response_model=OutStatsSchemas)
+async def get_library_stats(
+    limit: int = Query(10, ge=1, le=100),
+    user: "User" = Depends(current_superuser_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        result = await get_stats(session=session, limit=limit)
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    return result
+
+
+@router.get("/on-hands", response_model=list[OutBookOnHandsSchemas])
 async def get_books_user(
     user: "User" = Depends(current_user_authorization),
     session: AsyncSession = Depends(get_async_session),
@@ -103,7 +228,7 @@ async def get_books_user(
     return result
 
 
-@router.get("/{user_id}/", response_model=list[OutBookFoolSchemas])
+@router.get("/{user_id}/", response_model=list[OutBookOnHandsSchemas])
 async def get_book_user_by_id(
     user_id: int,
     user: "User" = Depends(current_superuser_user),
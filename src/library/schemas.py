@@ -1,6 +1,9 @@
 from datetime import datetime
+from typing import Optional
 
-from pydantic import BaseModel, field_serializer
+from pydantic import BaseModel, Field, field_serializer
+
+from src.books.schemas import OutBookFoolSchemas
 
 
 class ReceivingBaseSchemas(BaseModel):
@@ -15,6 +18,10 @@ class ReceivingReturnSchemas(ReceivingBaseSchemas):
     pass
 
 
+class HoldCreateSchemas(ReceivingBaseSchemas):
+    pass
+
+
 class OutReceivingSchemas(ReceivingBaseSchemas):
     user_id: int
     date_of_issue: datetime
@@ -27,3 +34,71 @@ class OutReceivingSchemas(ReceivingBaseSchemas):
     @field_serializer("date_of_return")
     def serialize_date_of_return(self, dt: datetime, _info):
         return dt.strftime("%d-%b-%Y")
+
+
+class ReceivingBatchSchemas(BaseModel):
+    books_ids: list[int] = Field(min_length=1, max_length=100)
+
+
+class OutBatchItemSchemas(ReceivingBaseSchemas):
+    success: bool
+    detail: str
+
+
+class OutBatchSchemas(BaseModel):
+    items: list[OutBatchItemSchemas]
+
+
+class OutHoldSchemas(ReceivingBaseSchemas):
+    user_id: int
+    created_at: datetime
+    position: int  # место в очереди, начиная с 1
+
+    @field_serializer("created_at")
+    def serialize_created_at(self, dt: datetime, _info):
+        return dt.strftime("%d-%b-%Y")
+
+
+class OverdueEventSchemas(BaseModel):
+    loan_id: int
+    user_id: int
+    book_id: int
+    date_of_return: datetime
+    days_overdue: int
+
+
+class OutOverdueMetricsSchemas(BaseModel):
+    scans_total: int = 0
+    scans_failed: int = 0
+    events_total: int = 0
+    backlog: int = 0  # просроченных выдач в последнем проходе
+    last_scan_at: Optional[datetime] = None
+    last_scan_duration: Optional[float] = None  # секунд
+
+
+class OutBookOnHandsSchemas(OutBookFoolSchemas):
+    date_of_issue: datetime
+    date_of_return: datetime
+
+    @field_serializer("date_of_issue")
+    def serialize_date_of_issue(self, dt: datetime, _info):
+        return dt.strftime("%d-%b-%Y")
+
+    @field_serializer("date_of_return")
+    def serialize_date_of_return(self, dt: datetime, _info):
+        return dt.strftime("%d-%b-%Y")
+
+
+class OutStatsItemSchemas(BaseModel):
+    id: int
+    name: str
+    active: int  # на руках сейчас
+    total: int  # выдач за все время
+
+
+class OutStatsSchemas(BaseModel):
+    active_loans: int
+    total_loans: int
+    books: list[OutStatsItemSchemas]
+    genres: list[OutStatsItemSchemas]
+    readers: list[OutStatsItemSchemas]
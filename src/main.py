@@ -1,10 +1,19 @@
+import asyncio
 import warnings
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse, Response
 from fastapi_pagination import add_pagination
 from fastapi_pagination.utils import FastAPIPaginationWarning
 import uvicorn
 
+from src.core.database import async_session_maker
+from src.books.suggest import suggest_index
+from src.core.config import setting
+from src.core.hashing import password_hasher
+from src.library.overdue import overdue_scanner
+from src.users.revocation import revocation_list
 from src.users.routers import router as router_users
 from src.authors.routers import router as router_authors
 from src.genres.routers import router as router_genres
@@ -13,7 +22,24 @@ from src.library.routers import router as router_library
 
 warnings.simplefilter("ignore", FastAPIPaginationWarning)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with async_session_maker() as session:
+        await suggest_index.load(session=session)
+        await revocation_list.load(session=session)
+    overdue_task = None
+    if setting.overdue.enabled:
+        overdue_task = asyncio.create_task(overdue_scanner.run(async_session_maker))
+    yield
+    if overdue_task is not None:
+        overdue_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await overdue_task
+    password_hasher.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(router_users)
 app.include_router(router_authors)
@@ -0,0 +1,100 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import configure_logging, setting
+from src.users.models import User
+
+configure_logging(logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def user_snapshot(user: User) -> User:
+    # Копия без сессии: ее атрибуты не истекают после commit чужой сессии
+    return User(
+        **{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    )
+
+
+class UserCache:
+    """
+    LRU кеш строк users процесса с временем жизни ttl секунд.
+    update_user_db и delete_user_db сбрасывают запись сразу, изменения
+    из других воркеров видны не позднее ttl. Удаленный пользователь
+    остается в кеше отметкой до истечения выданных ему токенов
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[int, tuple[float, Optional[User]]] = OrderedDict()
+
+    async def get(
+        self, session: AsyncSession, id_user: int, version: Optional[int] = None
+    ) -> Optional[User]:
+        """
+        Пользователь по id из кеша или из БД
+        :param version: Optional[int]
+            версия из токена: запись старше нее перечитывается из БД
+        :return: Optional[User]
+            None, если пользователь не найден или удален
+        """
+        entry = self._entries.get(id_user)
+        if entry is not None and entry[0] > time.monotonic():
+            user: Optional[User] = entry[1]
+            if user is None or version is None or user.version >= version:
+                self.hits += 1
+                self._entries.move_to_end(id_user)
+                return user
+
+        self.misses += 1
+        logger.info("User request by id %d" % id_user)
+        found: Optional[User] = await session.get(User, id_user)
+        if found is None:
+            return None
+        user = user_snapshot(found)
+        self._put(id_user, user, self.ttl)
+        return user
+
+    def is_current(self, id_user: int, version: Optional[int]) -> bool:
+        """
+        Claims токена подтверждены живой записью кеша: пользователь
+        не удален и не менялся после выдачи токена. Без записи claims
+        не принимаются, пользователь перечитывается из БД
+        """
+        entry = self._entries.get(id_user)
+        if entry is None or entry[0] <= time.monotonic():
+            return False
+        user: Optional[User] = entry[1]
+        return user is not None and version is not None and user.version <= version
+
+    def peek(self, id_user: int) -> Optional[User]:
+        entry = self._entries.get(id_user)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def invalidate(self, user: User) -> None:
+        # Запись заменяется свежим снимком, а не удаляется: по его версии
+        # токены, выданные до изменения, перестают проходить по одним claims
+        self._put(user.id, user_snapshot(user), self.ttl)
+
+    def forget(self, id_user: int) -> None:
+        self._put(id_user, None, setting.auth_jwt.access_token_expire_minutes * 60)
+
+    def _put(self, id_user: int, user: Optional[User], ttl: float) -> None:
+        self._entries.pop(id_user, None)
+        self._entries[id_user] = (time.monotonic() + ttl, user)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+user_cache = UserCache(
+    ttl=setting.cache.user_ttl, max_entries=setting.cache.user_max_entries
+)
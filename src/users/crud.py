@@ -14,7 +14,8 @@ from src.core.exceptions import (
     ExceptUser,
     ErrorInData,
 )
-from src.core.jwt_utils import create_hash_password
+from src.core.hashing import password_hasher
+from src.users.cache import user_cache
 from src.users.models import User
 from src.users.schemas import (
     UserCreateSchemas,
@@ -74,9 +75,8 @@ async def create_user(session: AsyncSession, user_data: UserCreateSchemas) -> Us
     except ValueError as exc:
         raise ErrorInData(exc)
     else:
-        new_user.hashed_password = create_hash_password(
-            new_user.hashed_password
-        ).decode()
+        hashed_password: bytes = await password_hasher.hash(new_user.hashed_password)
+        new_user.hashed_password = hashed_password.decode()
         session.add(new_user)
         await session.commit()
         logger.info("User by name %s created" % user_data.username)
@@ -103,16 +103,20 @@ async def update_user_db(
             exclude_unset=partial
         ).items():  # Преобразовываем объект в словарь
             setattr(user, name, value)
+        user.version = user.version + 1
         await session.commit()
     except IntegrityError:
         await session.rollback()
         raise UniqueViolationError(
             "Duplicate key value violates unique constraint users_email_key"
         )
+    user_cache.invalidate(user)
     return user
 
 
 async def delete_user_db(session: AsyncSession, user: User) -> None:
     logger.info("Delete user by id %d" % user.id)
+    id_user: int = user.id
     await session.delete(user)
     await session.commit()
+    user_cache.forget(id_user)
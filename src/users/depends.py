@@ -8,17 +8,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.config import COOKIE_NAME
 from src.core.database import get_async_session
+from src.core.exceptions import ExceptDB
 from src.core.jwt_utils import decode_jwt
+from src.users.cache import user_cache
 from src.users.crud import get_user_by_id
 from src.users.models import User
+from src.users.revocation import revocation_list
 
 cookie_scheme = APIKeyCookie(name=COOKIE_NAME)
 
 
-async def current_user_authorization(
-    token: str = Depends(cookie_scheme),
-    session: AsyncSession = Depends(get_async_session),
-) -> User:
+async def token_payload(token: Optional[str], session: AsyncSession) -> dict:
     if token is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="User not authorized"
@@ -31,8 +31,42 @@ async def current_user_authorization(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="User not authorized"
         )
 
+    try:
+        revoked: bool = await revocation_list.is_revoked(
+            session=session, payload=payload
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    if revoked:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked"
+        )
+    return payload
+
+
+async def current_token_payload(
+    token: str = Depends(cookie_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> dict:
+    return await token_payload(token=token, session=session)
+
+
+async def current_user_authorization(
+    token: str = Depends(cookie_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> User:
+    payload: dict = await token_payload(token=token, session=session)
     id_user: int = int(payload["sub"])
-    user: User = await get_user_by_id(session=session, id_user=id_user)
+    user: Optional[User] = await user_cache.get(
+        session=session, id_user=id_user, version=payload.get("ver")
+    )
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="User not authorized"
+        )
 
     return user
 
@@ -41,8 +75,23 @@ async def current_superuser_user(
     token: str = Depends(cookie_scheme),
     session: AsyncSession = Depends(get_async_session),
 ) -> User:
+    payload: dict = await token_payload(token=token, session=session)
+    id_user: int = int(payload["sub"])
 
-    user: User = await current_user_authorization(token=token, session=session)
+    # Без запроса к БД, если в кеше процесса есть запись пользователя
+    # не новее claims токена; права берутся из этой записи
+    if payload.get("adm") is not None and user_cache.is_current(
+        id_user=id_user, version=payload.get("ver")
+    ):
+        user: Optional[User] = user_cache.peek(id_user)
+    else:
+        user = await user_cache.get(
+            session=session, id_user=id_user, version=payload.get("ver")
+        )
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="User not authorized"
+            )
 
     if not user.is_superuser:
         raise HTTPException(
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
 
-from sqlalchemy import Boolean, DateTime, func
+from sqlalchemy import Boolean, DateTime, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.database import Base
@@ -25,5 +25,20 @@ class User(Base):
     )
     hashed_password: Mapped[str]
     is_superuser: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Растет при каждом изменении пользователя, попадает в claim "ver" JWT
+    version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
 
     books: Mapped[list["ReceivingBook"]] = relationship(back_populates="user")
+
+
+class RevokedToken(Base):
+    """
+    Отозванные токены. key - jti токена или "user:<id>" для отзыва всех токенов
+    пользователя, выданных до revoked_at. Строка не нужна после expires_at
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    revoked_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True))
+    expires_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), index=True)
@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Result
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import configure_logging, setting
+from src.core.exceptions import ExceptDB
+from src.core.versions import bump_version, get_version
+from src.users.models import RevokedToken
+
+configure_logging(logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def user_key(id_user: int) -> str:
+    return f"user:{id_user}"
+
+
+class BloomFilter:
+    """
+    Фильтр Блума: "нет" - точно нет, "да" - возможно есть.
+    Размер и число хешей подбираются по ожидаемому числу ключей и доле
+    ложных срабатываний
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size: int = max(
+            int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8
+        )
+        self.hashes: int = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Двойное хеширование: k позиций из двух половин одного дайджеста
+        digest: bytes = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class RevocationList:
+    """
+    Проверка отзыва токена. Сначала ключ ищется в фильтре Блума процесса,
+    в БД идет запрос только при срабатывании фильтра. Фильтр
+    перестраивается из revoked_tokens, когда версия таблицы изменилась;
+    версия проверяется не чаще check_interval секунд, поэтому отзыв
+    в другом воркере действует здесь не позднее этого интервала
+    """
+
+    def __init__(self, check_interval: float, capacity: int, error_rate: float):
+        self.check_interval = check_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.version: Optional[int] = None
+        self._filter = BloomFilter(capacity=capacity, error_rate=error_rate)
+        self._checked_at: float = 0.0
+        self._lock = asyncio.Lock()
+
+    async def load(self, session: AsyncSession) -> None:
+        version: int = await get_version(
+            session=session, name=RevokedToken.__tablename__
+        )
+        stmt = select(RevokedToken.key).filter(
+            RevokedToken.expires_at > datetime.now(timezone.utc)
+        )
+        result: Result = await session.execute(stmt)
+        keys: list[str] = list(result.scalars().all())
+
+        bloom = BloomFilter(
+            capacity=max(self.capacity, len(keys) * 2), error_rate=self.error_rate
+        )
+        for key in keys:
+            bloom.add(key)
+        self._filter = bloom
+        self.version = version
+        self._checked_at = time.monotonic()
+        logger.info(
+            "Revocation list loaded, version %s, %d keys" % (version, len(keys))
+        )
+
+    async def is_revoked(self, session: AsyncSession, payload: dict) -> bool:
+        """
+        Отозван ли токен: по своему jti или вместе со всеми токенами пользователя
+        :param session: AsyncSession
+            сессия БД
+        :param payload: dict
+            содержание проверенного токена
+        :return: bool
+        """
+        if (
+            self.version is None
+            or time.monotonic() - self._checked_at >= self.check_interval
+        ):
+            async with self._lock:
+                try:
+                    await self._refresh(session=session)
+                except SQLAlchemyError as exc:
+                    logger.exception("Error in data base %s", exc)
+                    raise ExceptDB(exc)
+
+        keys: list[str] = [
+            key
+            for key in (payload.get("jti"), user_key(int(payload["sub"])))
+            if key is not None and key in self._filter
+        ]
+        if not keys:
+            return False
+
+        stmt = select(RevokedToken).filter(RevokedToken.key.in_(keys))
+        try:
+            result: Result = await session.execute(stmt)
+        except SQLAlchemyError as exc:
+            logger.exception("Error in data base %s", exc)
+            raise ExceptDB(exc)
+        for revoked in result.scalars().all():
+            if revoked.key != user_key(int(payload["sub"])):
+                return True
+            # Отзыв всех токенов пользователя не касается выданных после него;
+            # iat старых токенов в целых секундах, для них отзыв действует
+            # до конца секунды
+            if payload.get("iat", 0) <= revoked.revoked_at.timestamp():
+                return True
+        return False
+
+    async def revoke(
+        self, session: AsyncSession, key: str, expires_at: datetime
+    ) -> None:
+        """
+        Отзывает токен по jti или все токены пользователя по user_key
+        :param key: str
+            jti токена или user_key(id)
+        :param expires_at: datetime
+            когда истекают отзываемые токены и строку можно удалить
+        """
+        logger.info("Revoke token %s" % key)
+        now: datetime = datetime.now(timezone.utc)
+        stmt = (
+            insert(RevokedToken)
+            .values(key=key, revoked_at=now, expires_at=expires_at)
+            .on_conflict_do_update(
+                index_elements=[RevokedToken.key],
+                set_={"revoked_at": now, "expires_at": expires_at},
+            )
+        )
+        try:
+            await session.execute(
+                delete(RevokedToken).filter(RevokedToken.expires_at <= now)
+            )
+            await session.execute(stmt)
+            version: int = await bump_version(
+                session=session, name=RevokedToken.__tablename__
+            )
+            await session.commit()
+        except SQLAlchemyError as exc:
+            logger.exception("Error in data base %s", exc)
+            await session.rollback()
+            raise ExceptDB(exc)
+
+        self._filter.add(key)
+        # Чужие отзывы между версиями подхватит следующая проверка
+        if self.version is not None and version == self.version + 1:
+            self.version = version
+
+    async def _refresh(self, session: AsyncSession) -> None:
+        if self.version is None:
+            await self.load(session=session)
+            return
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        version: int = await get_version(
+            session=session, name=RevokedToken.__tablename__
+        )
+        if version != self.version:
+            await self.load(session=session)
+        else:
+            self._checked_at = time.monotonic()
+
+
+revocation_list = RevocationList(
+    check_interval=setting.cache.revocation_check_interval,
+    capacity=setting.cache.revocation_capacity,
+    error_rate=setting.cache.revocation_error_rate,
+)
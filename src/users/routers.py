@@ -1,18 +1,24 @@
-from fastapi import APIRouter, Depends, Response, status
+import math
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, Request, Response, status
 from fastapi.exceptions import HTTPException
 from fastapi_pagination import Page, paginate
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.config import COOKIE_NAME
+from src.core.config import COOKIE_NAME, setting
 from src.core.database import get_async_session
 from src.core.exceptions import (
     ErrorInData,
     NotFindUser,
     EmailInUse,
+    ExceptDB,
     ExceptUser,
+    HashPoolBusy,
     UniqueViolationError,
 )
-from src.core.jwt_utils import create_jwt, validate_password
+from src.core.hashing import OutHashMetricsSchemas, password_hasher
+from src.core.jwt_utils import create_jwt
 from src.users.crud import (
     get_user_from_db,
     create_user,
@@ -22,9 +28,12 @@ from src.users.crud import (
 )
 from src.users.depends import (
     current_superuser_user,
+    current_token_payload,
     user_by_id,
 )
 from src.users.models import User
+from src.users.revocation import revocation_list, user_key
+from src.users.throttling import client_ip, login_throttle
 from src.users.schemas import (
     UserCreateSchemas,
     LoginSchemas,
@@ -55,6 +64,12 @@ async def user_registration(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"The user with the username: {user.username} is already registered",
         )
+    except HashPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many registrations, try again later",
+            headers={"Retry-After": "1"},
+        )
     except ErrorInData:
         pass
     else:
@@ -63,8 +78,20 @@ async def user_registration(
 
 @router.post("/login", response_class=Response, status_code=status.HTTP_202_ACCEPTED)
 async def userlogin(
-    data_login: LoginSchemas, session: AsyncSession = Depends(get_async_session)
+    data_login: LoginSchemas,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
 ):
+    retry_after: float = login_throttle.acquire(
+        username=data_login.username, ip=client_ip(request)
+    )
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
     try:
         user: User = await get_user_from_db(
             session=session, username=data_login.username
@@ -75,10 +102,21 @@ async def userlogin(
             detail=f"The user with the username: {data_login.username} not found",
         )
 
-    if validate_password(
-        password=data_login.password, hashed_password=user.hashed_password.encode()
-    ):
-        access_token: str = create_jwt(str(user.id))
+    try:
+        valid: bool = await password_hasher.verify(
+            password=data_login.password, hashed_password=user.hashed_password.encode()
+        )
+    except HashPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    if valid:
+        access_token: str = create_jwt(
+            str(user.id), is_superuser=user.is_superuser, version=user.version
+        )
 
         resp = Response(
             content="The user is logged in",
@@ -93,6 +131,39 @@ async def userlogin(
         )
 
 
+@router.post("/logout", response_class=Response, status_code=status.HTTP_202_ACCEPTED)
+async def userlogout(
+    payload: dict = Depends(current_token_payload),
+    session: AsyncSession = Depends(get_async_session),
+):
+    if "jti" in payload:
+        try:
+            await revocation_list.revoke(
+                session=session,
+                key=payload["jti"],
+                expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc),
+            )
+        except ExceptDB as exp:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{exp}",
+            )
+
+    resp = Response(
+        content="The user is logged out",
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+    resp.delete_cookie(key=COOKIE_NAME, httponly=True)
+    return resp
+
+
+@router.get("/hash/metrics", response_model=OutHashMetricsSchemas)
+async def get_hash_metrics(
+    user: User = Depends(current_superuser_user),
+):
+    return password_hasher.metrics
+
+
 @router.get(
     "/list",
     response_model=Page[OutUserSchemas],
@@ -159,3 +230,24 @@ async def delete_user(
     session: AsyncSession = Depends(get_async_session),
 ) -> None:
     await delete_user_db(session=session, user=user)
+
+
+@router.post("/{id_user}/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_user_tokens(
+    user: User = Depends(user_by_id),
+    super_user: User = Depends(current_superuser_user),
+    session: AsyncSession = Depends(get_async_session),
+) -> None:
+    # Все токены пользователя, выданные до этого момента
+    expires_at: datetime = datetime.now(timezone.utc) + timedelta(
+        minutes=setting.auth_jwt.access_token_expire_minutes
+    )
+    try:
+        await revocation_list.revoke(
+            session=session, key=user_key(user.id), expires_at=expires_at
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
@@ -0,0 +1,140 @@
+import logging
+import time
+from collections import OrderedDict
+from ipaddress import ip_address
+from typing import Optional
+
+from fastapi import Request
+
+from src.core.config import configure_logging, setting
+
+configure_logging(logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+    """
+    Корзины токенов по ключу: емкость burst, пополнение rate токенов в секунду.
+    Корзина - два float в OrderedDict, проверка и списание O(1).
+    Полные корзины не отличаются от новых и удаляются раз в evict_interval,
+    при переполнении max_entries вытесняются давно не использованные
+    """
+
+    def __init__(
+        self, rate: float, burst: int, max_entries: int, evict_interval: float
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_entries = max_entries
+        self.evict_interval = evict_interval
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self._evicted_at: float = time.monotonic()
+
+    def acquire(self, key: str, now: Optional[float] = None) -> float:
+        """
+        Списывает токен из корзины ключа
+        :param key: str
+            имя пользователя или адрес клиента
+        :return: float
+            0, если попытка разрешена, иначе - секунд до следующего токена
+        """
+        now = time.monotonic() if now is None else now
+        if now - self._evicted_at >= self.evict_interval:
+            self.evict(now=now)
+
+        bucket: Optional[list[float]] = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / self.rate
+
+    def evict(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        # Ключи упорядочены по последнему обращению: проход идет с самых
+        # старых и останавливается на первой еще не пополнившейся корзине
+        while self._buckets:
+            key, (tokens, updated_at) = next(iter(self._buckets.items()))
+            if tokens + (now - updated_at) * self.rate < self.burst:
+                break
+            del self._buckets[key]
+        self._evicted_at = now
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class LoginThrottle:
+    """
+    Ограничение попыток входа по имени пользователя и по адресу клиента.
+    Проверяется до поиска пользователя и bcrypt, поэтому перебор паролей
+    не превращается в нагрузку на БД и CPU. Корзины свои у каждого воркера
+    """
+
+    def __init__(self, by_username: TokenBucketLimiter, by_ip: TokenBucketLimiter):
+        self.by_username = by_username
+        self.by_ip = by_ip
+        self.rejected_total: int = 0
+
+    def acquire(self, username: str, ip: str, now: Optional[float] = None) -> float:
+        """
+        :return: float
+            0, если вход можно проверять, иначе - секунд до повторной попытки
+        """
+        retry_after: float = self.by_ip.acquire(f"ip:{ip}", now=now)
+        if not retry_after:
+            retry_after = self.by_username.acquire(
+                f"user:{username.casefold()}", now=now
+            )
+        if retry_after:
+            self.rejected_total += 1
+            logger.info("Login throttled for %s from %s" % (username, ip))
+        return retry_after
+
+
+def trusted_proxy(address: str) -> bool:
+    try:
+        ip = ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in setting.login_throttle.trusted_proxies)
+
+
+def client_ip(request: Request) -> str:
+    # X-Forwarded-For читается, только если запрос пришел от доверенного
+    # прокси. Каждый прокси дописывает адрес в конец, начало заголовка мог
+    # подставить сам клиент: берется самый правый адрес не из прокси
+    peer: str = request.client.host if request.client else "unknown"
+    forwarded: Optional[str] = request.headers.get("x-forwarded-for")
+    if not forwarded or not trusted_proxy(peer):
+        return peer
+    hops: list[str] = [hop.strip() for hop in forwarded.split(",")]
+    for hop in reversed(hops):
+        if not trusted_proxy(hop):
+            return hop
+    return hops[0]
+
+
+login_throttle = LoginThrottle(
+    by_username=TokenBucketLimiter(
+        rate=setting.login_throttle.username_rate,
+        burst=setting.login_throttle.username_burst,
+        max_entries=setting.login_throttle.max_entries,
+        evict_interval=setting.login_throttle.evict_interval,
+    ),
+    by_ip=TokenBucketLimiter(
+        rate=setting.login_throttle.ip_rate,
+        burst=setting.login_throttle.ip_burst,
+        max_entries=setting.login_throttle.max_entries,
+        evict_interval=setting.login_throttle.evict_interval,
+    ),
+)
@@ -1,7 +1,13 @@
+import json
+
 from httpx import AsyncClient
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.books.models import Book
+from src.books.models import Book, BookRead
+from src.books.suggest import SUGGEST_VERSION, SuggestIndex
+from src.core.versions import get_version
+from src.core.cache import LocalCache, SharedCache, cache_tag
 from src.users.crud import get_user_from_db
 from src.core.jwt_utils import create_jwt
 from src.core.config import COOKIE_NAME
@@ -88,6 +94,64 @@ async def test_get_list_books(client: AsyncClient, db_session: AsyncSession):
     assert response.json()["items"][0]["title"] == "Капитанская дочка"
 
 
+async def test_get_list_books_cursor(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/books/list/cursor?size=1", cookies=cookies)
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["title"] == "Капитанская дочка"
+    assert response.json()["items"][0]["genres"] == ["Роман"]
+    assert response.json()["next_cursor"] is None
+
+    response = await client.get("/books/list/cursor?cursor=1", cookies=cookies)
+
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+
+
+async def test_get_list_books_by_genre(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/books/list?genre_ids=1&genre_ids=2", cookies=cookies)
+
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+
+    response = await client.get(
+        "/books/list?genre_ids=1&genre_ids=2&genre_match=all", cookies=cookies
+    )
+
+    assert response.status_code == 200
+    assert response.json()["total"] == 0
+
+
+async def test_get_list_books_etag(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/books/list", cookies=cookies)
+    etag: str = response.headers["ETag"]
+
+    assert response.status_code == 200
+    assert etag.startswith("W/")
+
+    response = await client.get(
+        "/books/list", cookies=cookies, headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    response = await client.get(
+        "/books/list?size=1", cookies=cookies, headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 200
+
+
 async def test_get_list_books_not_admin(client: AsyncClient):
     response = await client.get("/books/list")
 
@@ -122,6 +186,97 @@ async def test_put_book_by_id(client: AsyncClient, db_session: AsyncSession):
     assert response.json()["title"] == "Test1"
 
 
+async def test_get_list_books_after_update(
+    client: AsyncClient, db_session: AsyncSession
+):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/books/list", cookies=cookies)
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["title"] == "Test1"
+
+
+async def test_suggest_books(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/books/suggest?q=пуш", cookies=cookies)
+
+    assert response.status_code == 200
+    assert response.json() == [{"kind": "author", "id": 1, "text": "Александр Пушкин"}]
+
+    response = await client.get("/books/suggest?q=TES", cookies=cookies)
+
+    assert response.status_code == 200
+    assert response.json() == [{"kind": "book", "id": 1, "text": "Test1"}]
+
+
+async def test_suggest_version_on_count_update(
+    client: AsyncClient, db_session: AsyncSession
+):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    version: int = await get_version(db_session, SUGGEST_VERSION)
+    response = await client.patch("/books/1/", cookies=cookies, json={"count": 3})
+
+    assert response.status_code == 200
+    assert await get_version(db_session, SUGGEST_VERSION) == version
+
+
+async def test_suggest_reload_in_background(db_session: AsyncSession):
+    index = SuggestIndex(check_interval=0.0)
+    await index.load(db_session)
+    version: int = index.version
+    index.version -= 1  # снимок другого воркера устарел
+    index.discard("book", 1, version=0)
+
+    # Запрос не ждет перестройки и отвечает по прежнему индексу
+    assert await index.suggest(db_session, "tes", limit=10) == []
+
+    await index._reload_task
+
+    assert index.version == version
+    assert [item.id for item in index.search("tes", limit=10)] == [1]
+
+
+async def test_book_read_model(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.put(
+        "/genres/1/", cookies=cookies, json={"title": "Повесть"}
+    )
+    book = await db_session.get(BookRead, 1, populate_existing=True)
+
+    assert response.status_code == 200
+    assert book.title == "Test1"
+    assert book.author_full_name == "Александр Пушкин"
+    assert book.genres == ["Повесть"]
+
+    response = await client.put("/genres/1/", cookies=cookies, json={"title": "Роман"})
+    await db_session.refresh(book)
+
+    assert response.status_code == 200
+    assert book.genres == ["Роман"]
+
+
+async def test_put_book_bad_links(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    data = {"id_author": 5, "genres_ids": [1, 4, 3]}
+    response = await client.patch("/books/1/", cookies=cookies, json=data)
+
+    assert response.status_code == 400
+    assert (
+        response.json()["detail"]
+        == "Not find author with id 5; Not find genres with id 3, 4"
+    )
+
+
 async def test_find_book_by_title(client: AsyncClient, db_session: AsyncSession):
     user = await get_user_from_db(db_session, username_admin)
     jwt: str = create_jwt(str(user.id))
@@ -133,6 +288,17 @@ async def test_find_book_by_title(client: AsyncClient, db_session: AsyncSession)
     assert response.json()["items"][0]["title"] == "Test1"
 
 
+async def test_find_book_by_title_ranked(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    data = {"text": "tes"}
+    response = await client.post("/books/title?ranked=true", cookies=cookies, json=data)
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["title"] == "Test1"
+
+
 async def test_find_book_by_author(client: AsyncClient, db_session: AsyncSession):
     user = await get_user_from_db(db_session, username_admin)
     jwt: str = create_jwt(str(user.id))
@@ -145,6 +311,46 @@ async def test_find_book_by_author(client: AsyncClient, db_session: AsyncSession
     assert response.json()["items"][0]["books"][0]["title"] == "Test1"
 
 
+async def test_find_book_by_author_limit(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    data = {"text": "Пушкин"}
+    response = await client.post(
+        "/books/author?books_limit=1", cookies=cookies, json=data
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()["items"][0]["books"]) == 1
+    assert response.json()["items"][0]["books_total"] == 1
+
+
+async def test_find_book_facets(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    data = {"text": "Test"}
+    response = await client.post("/books/title?facets=true", cookies=cookies, json=data)
+
+    facets = response.json()["facets"]
+    assert response.status_code == 200
+    assert facets["genres"] == [{"id": 1, "title": "Роман", "count": 1}]
+    assert facets["authors"] == [{"id": 1, "full_name": "Александр Пушкин", "count": 1}]
+    assert facets["decades"] == [{"decade": 1830, "count": 1}]
+
+    data = {"text": "Пушкин"}
+    response = await client.post(
+        "/books/author?facets=true", cookies=cookies, json=data
+    )
+
+    assert response.status_code == 200
+    assert response.json()["facets"]["decades"] == [{"decade": 1830, "count": 1}]
+
+    response = await client.post("/books/author", cookies=cookies, json=data)
+
+    assert response.json()["facets"] is None
+
+
 async def test_delete_book_by_id(client: AsyncClient, db_session: AsyncSession):
     user = await get_user_from_db(db_session, username_admin)
     jwt: str = create_jwt(str(user.id))
@@ -154,3 +360,208 @@ async def test_delete_book_by_id(client: AsyncClient, db_session: AsyncSession):
     user = await db_session.get(Book, 1)
     assert response.status_code == 204
     assert user is None
+
+
+async def test_import_books_csv(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    data = (
+        "title,description,release_date,count,id_author,genres_ids\n"
+        "Евгений Онегин,роман в стихах,1833-01-01,2,1,1\n"
+        "Нет автора,,1833-01-01,1,100,1\n"
+        "Нет жанра,,1833-01-01,1,1,1;7;8\n"
+        "Ошибка,,1833-01-01,-1,1,1\n"
+    )
+    response = await client.post(
+        "/books/import?format=csv", cookies=cookies, content=data.encode()
+    )
+
+    assert response.status_code == 201
+    assert response.json()["imported"] == 1
+    assert response.json()["errors_total"] == 3
+    assert [error["line"] for error in response.json()["errors"]] == [3, 4, 5]
+    assert response.json()["errors"][1]["detail"] == "Not find genres with id 7, 8"
+
+
+async def test_import_books_csv_multiline(
+    client: AsyncClient, db_session: AsyncSession
+):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    data = (
+        "title,description,release_date,count,id_author,genres_ids\r\n"
+        'Полтава,"поэма,\r\nв трех песнях",1829-01-01,1,1,1\r\n'
+        "Ошибка,,1829-01-01,-1,1,1\r\n"
+        'Без конца,"описание\n'
+    )
+    response = await client.post(
+        "/books/import?format=csv", cookies=cookies, content=data.encode()
+    )
+    stmt = select(Book).filter(Book.title == "Полтава")
+    book = (await db_session.execute(stmt)).scalar_one()
+
+    assert response.status_code == 201
+    assert response.json()["imported"] == 1
+    assert [error["line"] for error in response.json()["errors"]] == [4, 5]
+    assert response.json()["errors"][1]["detail"] == "Unterminated quoted field"
+    assert book.description == "поэма,\r\nв трех песнях"
+
+    await db_session.delete(book)
+    await db_session.commit()
+
+
+async def test_import_books_jsonl(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    data = (
+        '{"title": "Пиковая дама", "description": "", "release_date": "1834-01-01",'
+        ' "count": 1, "id_author": 1, "genres_ids": [1]}\n'
+        "{not json}\n"
+    )
+    response = await client.post(
+        "/books/import?format=jsonl", cookies=cookies, content=data.encode()
+    )
+
+    assert response.status_code == 201
+    assert response.json()["imported"] == 1
+    assert response.json()["errors"][0]["line"] == 2
+
+
+async def test_import_books_copy_error(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    # count проходит схему, но не помещается в integer столбца
+    data = (
+        '{"title": "Метель", "description": "", "release_date": "1831-01-01",'
+        ' "count": 10000000000, "id_author": 1, "genres_ids": [1]}\n'
+    )
+    response = await client.post(
+        "/books/import?format=jsonl", cookies=cookies, content=data.encode()
+    )
+
+    assert response.status_code == 400
+
+    # Нулевой символ отклоняет сервер при COPY
+    data = (
+        '{"title": "Метель\\u0000", "description": "", "release_date": "1831-01-01",'
+        ' "count": 1, "id_author": 1, "genres_ids": [1]}\n'
+    )
+    response = await client.post(
+        "/books/import?format=jsonl", cookies=cookies, content=data.encode()
+    )
+
+    assert response.status_code == 400
+
+    # Транзакция откачена, сессия снова работает
+    response = await client.get("/books/list", cookies=cookies)
+
+    assert response.status_code == 200
+
+
+async def test_export_books(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/books/export?format=ndjson", cookies=cookies)
+
+    lines = response.text.splitlines()
+    assert response.status_code == 200
+    assert len(lines) == 2
+    assert json.loads(lines[0])["title"] == "Евгений Онегин"
+    assert json.loads(lines[0])["genres"] == ["Роман"]
+
+    response = await client.get("/books/export?format=csv", cookies=cookies)
+
+    lines = response.text.splitlines()
+    assert response.status_code == 200
+    assert lines[0].startswith("id,title,description")
+    assert len(lines) == 3
+
+
+async def test_books_unknown_format(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/books/export?format=xml", cookies=cookies)
+
+    assert response.status_code == 422
+
+    response = await client.post(
+        "/books/import?format=xml", cookies=cookies, content=b""
+    )
+
+    assert response.status_code == 422
+
+    for url in ("/books/list", "/books/list/cursor"):
+        response = await client.get(f"{url}?genre_match=some", cookies=cookies)
+
+        assert response.status_code == 422
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: dict = dict()
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+async def test_local_cache_invalidate():
+    cache = LocalCache(max_entries=2)
+    await cache.set("a", 1, {cache_tag("book"), cache_tag("book", 1)}, ttl=30)
+    await cache.set("b", 2, {cache_tag("author")}, ttl=30)
+    await cache.set("c", 3, {cache_tag("book", 2)}, ttl=30)
+
+    assert await cache.get("a") is None
+    assert await cache.get("b") == 2
+
+    await cache.invalidate([cache_tag("book", 2)])
+
+    assert await cache.get("c") is None
+    assert await cache.get("b") == 2
+
+
+async def test_shared_cache_invalidate():
+    client = FakeRedis()
+    first, second = SharedCache(client=client), SharedCache(client=client)
+    await first.set("a", [1], {cache_tag("book"), cache_tag("book", 1)}, ttl=30)
+    await first.set("b", [2], {cache_tag("author", 1)}, ttl=30)
+
+    assert await second.get("a") == [1]
+
+    await second.invalidate([cache_tag("book", 1)])
+
+    assert await first.get("a") is None
+    assert await first.get("b") == [2]
+
+
+async def test_suggest_index_update():
+    index = SuggestIndex(check_interval=5.0)
+    index.version = 0
+    index.put("book", 1, "Евгений Онегин", version=1)
+    index.put("book", 2, "Капитанская дочка", version=2)
+
+    assert [item.id for item in index.search("оне", limit=10)] == [1]
+    assert [item.id for item in index.search("е", limit=10)] == [1]
+
+    index.put("book", 1, "Пиковая дама", version=3)
+    index.discard("book", 2, version=5)
+
+    assert index.search("оне", limit=10) == []
+    assert index.search("дочка", limit=10) == []
+    assert index.search("дам", limit=10)[0].text == "Пиковая дама"
+    assert index.version == 3
@@ -84,6 +84,24 @@ async def test_put_genre_by_id(client: AsyncClient, db_session: AsyncSession):
     assert response.json()["title"] == "Test1"
 
 
+async def test_get_genre_etag_after_update(
+    client: AsyncClient, db_session: AsyncSession
+):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/genres/1/", cookies=cookies)
+    etag: str = response.headers["ETag"]
+
+    response = await client.put("/genres/1/", cookies=cookies, json={"title": "Test1"})
+    response = await client.get(
+        "/genres/1/", cookies=cookies, headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
 async def test_delete_genre_by_id(client: AsyncClient, db_session: AsyncSession):
     user = await get_user_from_db(db_session, username_admin)
     jwt: str = create_jwt(str(user.id))
@@ -1,15 +1,26 @@
+import asyncio
+from datetime import datetime, timedelta
+
 from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 import pytest
 
 from src.books.models import Book
+from src.library.crud import create_receiving
+from src.library.models import CirculationStat, ReceivingBook
+from src.library.schemas import ReceivingCreateSchemas
+from src.library.overdue import OverdueScanner
 from src.users.crud import get_user_from_db
 from src.core.jwt_utils import create_jwt
 from src.core.config import COOKIE_NAME
+from src.core.versions import get_version
 
 username_admin = "Testlibrary"
 email_admin = "test_library@mail.ru"
 password_admin = "1qaz!QAZ"
+username_reader = "TestlibraryReader"
+email_reader = "test_library_reader@mail.ru"
 
 list_title_book = ["Test1", "Test2", "Test3", "Test4", "Test5", "Test6"]
 
@@ -114,7 +125,7 @@ async def test_receiving_5books(id_book, client: AsyncClient, db_session: AsyncS
         "book_id": id_book,
     }
     response = await client.post("/library/receiving", cookies=cookies, json=data)
-    book = await db_session.get(Book, id_book)
+    book = await db_session.get(Book, id_book, populate_existing=True)
 
     assert response.status_code == 201
     assert book.count == 0
@@ -140,11 +151,36 @@ async def test_return_book(client: AsyncClient, db_session: AsyncSession):
     data = {
         "book_id": 1,
     }
+    etag: str = (await client.get("/books/1/", cookies=cookies)).headers["ETag"]
+    version: int = await get_version(db_session, Book.__tablename__)
     response = await client.post("/library/return", cookies=cookies, json=data)
     book = await db_session.get(Book, 1)
 
     assert response.status_code == 201
     assert book.count == 1
+    # Остатки меняют свою версию, а не общую версию books
+    assert await get_version(db_session, Book.__tablename__) == version
+    response = await client.get(
+        "/books/1/", cookies=cookies, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+
+
+async def test_receiving_book_not_available(
+    client: AsyncClient, db_session: AsyncSession
+):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    data = {
+        "book_id": 2,
+    }
+    response = await client.post("/library/receiving", cookies=cookies, json=data)
+    book = await db_session.get(Book, 2, populate_existing=True)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "These books are not available"
+    assert book.count == 0
 
 
 async def test_return_book_not_have(client: AsyncClient, db_session: AsyncSession):
@@ -169,6 +205,8 @@ async def test_list_book_on_hands(client: AsyncClient, db_session: AsyncSession)
 
     assert response.status_code == 200
     assert len(response.json()) == 4
+    assert response.json()[0]["author"]["full_name"] == "Александр Пушкин"
+    assert "date_of_return" in response.json()[0]
 
 
 async def test_list_book_user_by_id(client: AsyncClient, db_session: AsyncSession):
@@ -185,3 +223,284 @@ async def test_list_book_user_by_id_not_permission(client: AsyncClient):
     response = await client.get("/library/1/")
 
     assert response.status_code == 403
+
+
+async def test_receiving_books_batch(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    data = {"books_ids": [10, 1, 6]}
+    response = await client.post("/library/receiving/batch", cookies=cookies, json=data)
+    book = await db_session.get(Book, 1, populate_existing=True)
+
+    assert response.status_code == 200
+    assert [item["success"] for item in response.json()["items"]] == [
+        False,
+        True,
+        False,
+    ]
+    assert response.json()["items"][0]["detail"] == "Not find book"
+    assert response.json()["items"][2]["detail"] == "The user has 5 books"
+    assert book.count == 0
+
+
+async def test_return_books_batch(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    data = {"books_ids": [1, 2, 6, 1]}
+    response = await client.post("/library/return/batch", cookies=cookies, json=data)
+    book = await db_session.get(Book, 2, populate_existing=True)
+
+    assert response.status_code == 200
+    assert [item["success"] for item in response.json()["items"]] == [
+        True,
+        True,
+        False,
+        False,
+    ]
+    assert response.json()["items"][2]["detail"] == "The user does not have this book"
+    assert book.count == 1
+
+
+async def test_place_hold(client: AsyncClient, db_session: AsyncSession):
+    user = {
+        "username": username_reader,
+        "first_name": "",
+        "last_name": "",
+        "email": email_reader,
+        "password": password_admin,
+    }
+    response = await client.post("/users/create", json=user)
+    assert response.status_code == 201
+
+    user = await get_user_from_db(db_session, username_reader)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.post("/library/holds", cookies=cookies, json={"book_id": 3})
+
+    assert response.status_code == 201
+    assert response.json()["position"] == 1
+
+    response = await client.post("/library/holds", cookies=cookies, json={"book_id": 3})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "The user already has a hold on this book"
+
+    response = await client.post("/library/holds", cookies=cookies, json={"book_id": 1})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "The book is available"
+
+
+async def test_return_book_to_hold(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.post(
+        "/library/return", cookies=cookies, json={"book_id": 3}
+    )
+    book = await db_session.get(Book, 3, populate_existing=True)
+
+    assert response.status_code == 201
+    assert book.count == 0
+
+    reader = await get_user_from_db(db_session, username_reader)
+    jwt: str = create_jwt(str(reader.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/library/on-hands", cookies=cookies)
+
+    assert response.status_code == 200
+    assert [book["id"] for book in response.json()] == [3]
+
+
+async def test_cancel_hold(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_reader)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.post("/library/holds", cookies=cookies, json={"book_id": 4})
+
+    assert response.status_code == 201
+
+    response = await client.delete("/library/holds/4/", cookies=cookies)
+
+    assert response.status_code == 204
+
+    response = await client.delete("/library/holds/4/", cookies=cookies)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "The user does not have a hold on this book"
+
+
+async def test_overdue_scan(db_session: AsyncSession):
+    events: list = list()
+
+    async def collect(batch):
+        events.extend(batch)
+
+    scanner = OverdueScanner(batch_size=2, handlers=[collect])
+    metrics = await scanner.scan(db_session, now=datetime.now() + timedelta(days=30))
+
+    assert metrics.backlog == 3
+    assert sorted(event.book_id for event in events) == [3, 4, 5]
+    assert all(event.days_overdue >= 15 for event in events)
+
+    metrics = await scanner.scan(db_session)
+
+    assert metrics.backlog == 0
+    assert metrics.scans_total == 2
+
+
+async def test_overdue_run_survives_errors():
+    scanner = OverdueScanner(batch_size=2, handlers=[])
+
+    def session_maker():
+        raise ConnectionRefusedError("database is restarting")
+
+    task = asyncio.create_task(scanner.run(session_maker))
+    await asyncio.sleep(0.01)
+
+    assert scanner.metrics.scans_failed == 1
+    assert not task.done()
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+async def test_overdue_metrics(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/library/overdue/metrics", cookies=cookies)
+
+    assert response.status_code == 200
+    assert "backlog" in response.json()
+
+
+async def test_library_stats(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/library/stats?limit=3", cookies=cookies)
+    on_hands: int = await db_session.scalar(select(func.count(ReceivingBook.id)))
+
+    assert response.status_code == 200
+    assert response.json()["active_loans"] == on_hands
+    assert response.json()["total_loans"] >= on_hands
+    assert len(response.json()["books"]) <= 3
+    assert response.json()["readers"][0]["name"] == username_admin
+
+
+async def test_book_duplicate_genre(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    data = {
+        "title": "Test7",
+        "description": "",
+        "release_date": "1836-01-01",
+        "count": 1,
+        "id_author": 1,
+        "genres_ids": [1, 1],
+    }
+    response = await client.post("/books/new", cookies=cookies, json=data)
+
+    assert response.status_code == 201
+    assert response.json()["genres_ids"] == [1]
+
+    # Строка, записанная до проверки повторов в схеме
+    book = Book(
+        title="Test8",
+        description="",
+        release_date=datetime(1836, 1, 1),
+        count=1,
+        id_author=1,
+        genres_ids=[1, 1],
+    )
+    db_session.add(book)
+    await db_session.commit()
+    genre_stat = select(CirculationStat.active).filter(
+        CirculationStat.kind == "genre", CirculationStat.object_id == 1
+    )
+    active: int = await db_session.scalar(genre_stat)
+    reader = await get_user_from_db(db_session, username_reader)
+    cookies_reader = {COOKIE_NAME: create_jwt(str(reader.id))}
+    response = await client.post(
+        "/library/receiving", cookies=cookies_reader, json={"book_id": book.id}
+    )
+
+    assert response.status_code == 201
+    assert await db_session.scalar(genre_stat) == active + 1
+
+    response = await client.post(
+        "/library/return", cookies=cookies_reader, json={"book_id": book.id}
+    )
+
+    assert response.status_code == 201
+    assert await db_session.scalar(genre_stat) == active
+
+
+async def test_receiving_limit_concurrent(
+    monkeypatch, db_engine, db_session: AsyncSession
+):
+    # У читателя одна книга: из двух параллельных выдач при лимите 2
+    # проходит только одна
+    monkeypatch.setattr("src.library.crud.BOOKS_LIMIT", 2)
+    reader = await get_user_from_db(db_session, username_reader)
+    await db_session.commit()
+    session_maker = async_sessionmaker(db_engine, expire_on_commit=False)
+    barrier = asyncio.Barrier(2)
+
+    async def receive(book_id: int):
+        async with session_maker() as session:
+            # Обе выдачи начинаются с уже открытыми соединениями
+            await session.connection()
+            await barrier.wait()
+            return await create_receiving(
+                session=session,
+                receiving_in=ReceivingCreateSchemas(book_id=book_id),
+                user_in=reader,
+            )
+
+    results = await asyncio.gather(receive(7), receive(8), return_exceptions=True)
+    issued = [result for result in results if not isinstance(result, Exception)]
+    on_hands: int = await db_session.scalar(
+        select(func.count(ReceivingBook.id)).filter(ReceivingBook.user_id == reader.id)
+    )
+
+    assert len(issued) == 1
+    assert on_hands == 2
+
+
+async def test_return_batch_holds_limit(
+    monkeypatch, client: AsyncClient, db_session: AsyncSession
+):
+    # Читатель первый в очередях двух возвращаемых книг, но до лимита
+    # ему остается одна книга: вторая возвращается на полку
+    monkeypatch.setattr("src.library.crud.BOOKS_LIMIT", 3)
+    reader = await get_user_from_db(db_session, username_reader)
+    cookies_reader = {COOKIE_NAME: create_jwt(str(reader.id))}
+    for book_id in (4, 5):
+        response = await client.post(
+            "/library/holds", cookies=cookies_reader, json={"book_id": book_id}
+        )
+
+        assert response.status_code == 201
+
+    user = await get_user_from_db(db_session, username_admin)
+    cookies = {COOKIE_NAME: create_jwt(str(user.id))}
+    response = await client.post(
+        "/library/return/batch", cookies=cookies, json={"books_ids": [4, 5]}
+    )
+    on_hands: int = await db_session.scalar(
+        select(func.count(ReceivingBook.id)).filter(ReceivingBook.user_id == reader.id)
+    )
+    shelved: int = await db_session.scalar(
+        select(func.sum(Book.count)).filter(Book.id.in_([4, 5]))
+    )
+
+    assert response.status_code == 200
+    assert all(item["success"] for item in response.json()["items"])
+    assert on_hands == 3
+    assert shelved == 1
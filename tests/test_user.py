@@ -1,10 +1,24 @@
+import asyncio
+from ipaddress import ip_network
+
+from fastapi import Request
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.users.cache import user_cache
 from src.users.models import User
+from src.users.revocation import BloomFilter
+from src.users.throttling import TokenBucketLimiter, client_ip
 from src.users.crud import get_user_from_db
-from src.core.jwt_utils import create_jwt
-from src.core.config import COOKIE_NAME
+from src.core.exceptions import HashPoolBusy
+from src.core.hashing import PasswordHasher
+from src.core.jwt_utils import (
+    create_jwt,
+    decode_jwt,
+    validate_password,
+    verified_tokens,
+)
+from src.core.config import COOKIE_NAME, setting
 
 username_admin = "TestUser"
 email_admin = "test_user@mail.ru"
@@ -82,6 +96,7 @@ async def test_login_user(client: AsyncClient):
     print(response.content)
     assert response.status_code == 202
     assert response.cookies.get(COOKIE_NAME) != None
+    assert decode_jwt(response.cookies.get(COOKIE_NAME))["adm"] is True
 
 
 async def test_get_list_user_admin(client: AsyncClient, db_session: AsyncSession):
@@ -93,6 +108,29 @@ async def test_get_list_user_admin(client: AsyncClient, db_session: AsyncSession
     assert response.status_code == 200
 
 
+async def test_hash_metrics(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    jwt: str = create_jwt(str(user.id))
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/users/hash/metrics", cookies=cookies)
+
+    assert response.status_code == 200
+    assert response.json()["calls_total"] >= 3
+    assert response.json()["in_flight"] == 0
+
+
+async def test_password_hasher_busy():
+    hasher = PasswordHasher(executor="thread", workers=1, max_queue=0)
+    results = await asyncio.gather(
+        hasher.hash("1qaz!QAZ"), hasher.hash("1qaz!QAZ"), return_exceptions=True
+    )
+    hasher.shutdown()
+
+    assert isinstance(results[1], HashPoolBusy)
+    assert validate_password("1qaz!QAZ", results[0])
+    assert hasher.metrics.rejected_total == 1
+
+
 async def test_get_list_user_not_admin(client: AsyncClient, db_session: AsyncSession):
     user = await get_user_from_db(db_session, username)
     jwt: str = create_jwt(str(user.id))
@@ -138,6 +176,136 @@ async def test_patch_user_by_id(client: AsyncClient, db_session: AsyncSession):
     assert response.json()["first_name"] == "Test2"
 
 
+async def test_superuser_stale_claims(client: AsyncClient, db_session: AsyncSession):
+    # Пользователь 2 изменен после выдачи токена: claims прежней версии
+    # не проходят без проверки в БД
+    jwt: str = create_jwt("2", is_superuser=True, version=0)
+    cookies = {COOKIE_NAME: jwt}
+    response = await client.get("/users/list", cookies=cookies)
+
+    assert response.status_code == 403
+
+
+async def test_superuser_claims_cold_cache(
+    client: AsyncClient, db_session: AsyncSession
+):
+    # Пустой кеш (другой воркер, истекший ttl): claims "adm" не принимаются
+    # без проверки пользователя в БД
+    user = await db_session.get(User, 2)
+    jwt: str = create_jwt("2", is_superuser=True, version=user.version)
+    cookies = {COOKIE_NAME: jwt}
+    user_cache._entries.clear()
+    response = await client.get("/users/list", cookies=cookies)
+
+    assert response.status_code == 403
+    assert user_cache.peek(2) is not None
+
+
+async def test_logout_user(client: AsyncClient):
+    user = {
+        "username": username_admin,
+        "password": password_admin,
+    }
+    response = await client.post("/users/login", json=user)
+    cookies = {COOKIE_NAME: response.cookies.get(COOKIE_NAME)}
+    client.cookies.clear()
+    response = await client.post("/users/logout", cookies=cookies)
+
+    assert response.status_code == 202
+
+    response = await client.get("/users/list", cookies=cookies)
+
+    assert response.status_code == 401
+
+
+async def test_login_throttled(client: AsyncClient):
+    user = {"username": "Mallory", "password": password_admin}
+    headers = {"X-Forwarded-For": "10.0.0.1"}
+    statuses = [
+        (await client.post("/users/login", json=user, headers=headers)).status_code
+        for _ in range(6)
+    ]
+    response = await client.post("/users/login", json=user, headers=headers)
+
+    assert statuses[:5] == [400] * 5
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_client_ip(monkeypatch):
+    def request(peer: str, forwarded: str) -> Request:
+        headers = [(b"x-forwarded-for", forwarded.encode())]
+        return Request({"type": "http", "headers": headers, "client": (peer, 80)})
+
+    # Без доверенных прокси заголовок подделывается клиентом
+    assert client_ip(request("203.0.113.7", "10.0.0.1")) == "203.0.113.7"
+
+    monkeypatch.setattr(
+        setting.login_throttle, "trusted_proxies", [ip_network("10.1.0.0/16")]
+    )
+
+    assert client_ip(request("203.0.113.7", "10.0.0.1")) == "203.0.113.7"
+    assert client_ip(request("10.1.0.2", "1.2.3.4, 203.0.113.7")) == "203.0.113.7"
+    assert client_ip(request("10.1.0.2", "203.0.113.7, 10.1.0.3")) == "203.0.113.7"
+
+
+def test_token_bucket_limiter():
+    limiter = TokenBucketLimiter(rate=1.0, burst=2, max_entries=2, evict_interval=60)
+
+    assert limiter.acquire("a", now=0.0) == 0
+    assert limiter.acquire("a", now=0.0) == 0
+    assert limiter.acquire("a", now=0.0) == 1.0
+    assert limiter.acquire("a", now=1.0) == 0
+
+    limiter.acquire("b", now=1.0)
+    limiter.acquire("c", now=1.0)
+
+    assert len(limiter) == 2
+
+    limiter.evict(now=10.0)
+
+    assert len(limiter) == 0
+
+
+async def test_revoke_user_tokens(client: AsyncClient, db_session: AsyncSession):
+    user = await get_user_from_db(db_session, username_admin)
+    cookies = {COOKIE_NAME: create_jwt(str(user.id))}
+    cookies_user = {COOKIE_NAME: create_jwt("2")}
+    response = await client.post("/users/2/revoke", cookies=cookies)
+
+    assert response.status_code == 204
+
+    response = await client.get("/users/2/", cookies=cookies_user)
+
+    assert response.status_code == 401
+
+    # Токен нового входа, выданный в ту же секунду, что и отзыв
+    cookies_user = {COOKIE_NAME: create_jwt("2")}
+    response = await client.get("/users/2/", cookies=cookies_user)
+
+    assert response.status_code == 200
+
+
+def test_decode_jwt_cache():
+    token: str = create_jwt("1")
+    payload: dict = decode_jwt(token)
+    hits: int = verified_tokens.hits
+
+    assert decode_jwt(token) == payload
+    assert verified_tokens.hits == hits + 1
+    assert decode_jwt(create_jwt("1")) != payload
+    assert verified_tokens.hits == hits + 1
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for key in range(1000):
+        bloom.add(f"jti{key}")
+
+    assert all(f"jti{key}" in bloom for key in range(1000))
+    assert sum(f"other{key}" in bloom for key in range(10000)) < 300
+
+
 async def test_delete_user_by_id(client: AsyncClient, db_session: AsyncSession):
     user = await get_user_from_db(db_session, username_admin)
     jwt: str = create_jwt(str(user.id))